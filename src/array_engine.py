@@ -0,0 +1,276 @@
+import numpy as np
+from config import *
+from engine import Engine
+from cell import INPUT_LABELS, OUTPUT_LABELS, arc_points
+from brains import BrainPool
+from vision import VisionTable
+import evolution
+
+class ArrayBrain:
+    def __init__(self, engine, index):
+        self.engine = engine
+        self.index = index
+
+    def get_weights(self):
+        return self.engine.brains.get_weights(self.index)
+
+class CellView:
+    # Read-only handle on one row of the population arrays, used by the info panel
+    def __init__(self, engine, index):
+        self.engine = engine
+        self.index = index
+        self.brain = ArrayBrain(engine, index)
+
+    def __eq__(self, other):
+        return isinstance(other, CellView) and other.index == self.index
+
+    def get_info(self):
+        e, i = self.engine, self.index
+        return {
+            "Position": f"({e.x[i]:.2f}, {e.y[i]:.2f})",
+            "Energy": f"{e.energy[i]:.2f}",
+            "Orientation": f"{e.orientation[i]:.2f}°",
+            "Lifetime": str(e.lifetime[i])
+        }
+
+    def get_neuron_activations(self):
+        e, i = self.engine, self.index
+        if e.lifetime[i] == 0:
+            return {"inputs": [], "hidden": [], "outputs": []}
+        activations = e.brains.get_activations(i)
+        return {
+            "inputs": list(zip(INPUT_LABELS, activations[0])),
+            "hidden": activations[1:-1],
+            "outputs": list(zip(OUTPUT_LABELS, activations[-1]))
+        }
+
+class ArrayEngine(Engine):
+    # Same simulation as Engine, but the population lives in contiguous arrays
+    # (one row per cell) and every per-tick step runs over all cells at once.
+    def __init__(self, seed=None):
+        super().__init__(seed)
+        self.brains = BrainPool(len(INPUT_LABELS), len(OUTPUT_LABELS))
+        self.vision = VisionTable()
+        self.top_genomes = self.brains.random_genomes(0, self.rng)  # Parents of the current generation, best first
+        self.allocate(0)
+
+    def allocate(self, n):
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        self.orientation = np.zeros(n)
+        self.energy = np.zeros(n)
+        self.lifetime = np.zeros(n, dtype=np.int64)
+        self.food_eaten = np.zeros(n, dtype=np.int64)
+        self.distance_traveled = np.zeros(n)
+        self.birth_time = np.zeros(n)
+        self.death_time = np.full(n, np.nan)
+        self.alive = np.zeros(n, dtype=bool)
+        self.brains.set_genomes(np.zeros((n, self.brains.genome_length)))
+
+    def spawn(self, x, y, genomes):
+        n = len(x)
+        self.allocate(n)
+        self.x[:] = x
+        self.y[:] = y
+        self.orientation[:] = self.rng.random(n) * 360
+        self.energy[:] = CELL_ENERGY_MAX
+        self.birth_time[:] = self.simulated_time
+        self.alive[:] = True
+        self.brains.set_genomes(genomes)
+
+    def initialize(self):
+        n = INITIAL_CELLS
+        self.spawn(self.rng.uniform(0, self.width, n), self.rng.uniform(0, self.height, n),
+                   self.brains.random_genomes(n, self.rng))
+
+        self.initial_food()
+        self.index_cells()
+
+    def get_inputs(self, idx):
+        inputs = np.empty((len(idx), len(INPUT_LABELS)))
+        inputs[:, 0] = self.energy[idx] / CELL_ENERGY_MAX
+        inputs[:, 1] = self.orientation[idx] / 360
+        inputs[:, 2:] = self.vision.sense(self.food.grid, self.x[idx], self.y[idx], self.orientation[idx])
+        return inputs
+
+    def step_cells(self, speed):
+        idx = np.flatnonzero(self.alive)
+        if len(idx) == 0:
+            return
+
+        profiler = self.profiler
+        profiler.count("cells_processed", len(idx))
+        profiler.count("food_probes", len(idx) * 3 * self.vision.vision_range)
+        profiler.start()
+        self.lifetime[idx] += 1
+        self.energy[idx] -= CELL_IDLE_COST * speed
+
+        inputs = self.get_inputs(idx)
+        profiler.lap("sensing")
+        outputs = self.brains.forward(inputs, idx)
+        profiler.lap("inference")
+
+        rotate_cw = outputs[:, 0] > 0.5
+        rotate_ccw = outputs[:, 1] > 0.5
+        move = outputs[:, 2] > 0.5
+
+        turn = 10 * (rotate_cw.astype(float) - rotate_ccw)
+        orientation = self.orientation[idx] + turn * speed
+        energy = self.energy[idx] - CELL_ROTATE_COST * speed * (rotate_cw.astype(float) + rotate_ccw)
+
+        # Every square the cell passes on its way can be eaten from, not only the last
+        path_x, path_y = arc_points(self.x[idx], self.y[idx], orientation, turn, 0.1 * move, speed)
+        path_x %= self.width
+        path_y %= self.height
+        self.x[idx] = path_x[:, -1]
+        self.y[idx] = path_y[:, -1]
+        self.distance_traveled[idx] += 0.1 * speed * move
+        energy -= CELL_MOVE_COST * speed * move
+
+        self.orientation[idx] = orientation % 360
+        self.energy[idx] = np.clip(energy, CELL_ENERGY_MIN, CELL_ENERGY_MAX)
+
+        died = idx[self.energy[idx] <= 0]
+        self.alive[died] = False
+        self.death_time[died] = self.simulated_time
+        if self.selected_cell is not None and not self.alive[self.selected_cell.index]:
+            self.selected_cell = None
+        profiler.lap("actuation")
+
+        fed = self.energy[idx] > 0
+        self.eat(idx[fed], path_x[fed], path_y[fed])
+        self.food.regrow((1 / FPS) * speed, self.simulated_time, self.rng)
+        profiler.lap("food")
+
+    def eat(self, idx, path_x, path_y):
+        # Each cell eats the food on every square along its path (one row of
+        # points per cell). When several cells reach the same food, the lowest
+        # index eats it, matching the order the object engine visits its cells in.
+        squares = (path_x.astype(np.int64) % self.width) * self.height + path_y.astype(np.int64) % self.height
+        # A square is only eaten from once on the way through it
+        new = np.ones(squares.shape, dtype=bool)
+        new[:, 1:] = squares[:, 1:] != squares[:, :-1]
+        cells = np.repeat(idx, squares.shape[1])[new.ravel()]
+        x, y = np.divmod(squares[new], self.height)
+        eaters, meals = np.unique(cells[self.food.consume(x, y)], return_counts=True)
+        self.energy[eaters] = np.minimum(CELL_ENERGY_MAX, self.energy[eaters] + FOOD_ENERGY * meals)
+        self.food_eaten[eaters] += meals
+        if RESPAWN_FOOD and len(eaters):
+            self.food.add(*self.rng.integers(0, [self.width, self.height], size=(meals.sum(), 2)).T)
+
+    def generation_over(self):
+        return self.simulated_time >= GENERATION_TIME or not self.alive.any()
+
+    def index_cells(self):
+        idx = np.flatnonzero(self.alive)
+        self.spatial.rebuild(self.x[idx], self.y[idx], idx)
+
+    def lifespans(self):
+        end = np.where(np.isnan(self.death_time), self.simulated_time, self.death_time)
+        return end - self.birth_time
+
+    def calculate_stats(self):
+        if len(self.alive):
+            self.stats["avg_lifespan"] = float(self.lifespans().mean())
+            self.stats["avg_food_eaten"] = float(self.food_eaten.mean())
+            self.stats["avg_distance"] = float(self.distance_traveled.mean())
+        else:
+            self.stats["avg_lifespan"] = 0
+            self.stats["avg_food_eaten"] = 0
+            self.stats["avg_distance"] = 0
+        self.stats["remaining_food"] = self.food.count()
+
+    def generation_values(self):
+        return {
+            "lifespan": self.lifespans(),
+            "food_eaten": self.food_eaten,
+            "distance": self.distance_traveled,
+            "fitness": self.lifetime,
+            "survivors": int(self.alive.sum()),
+        }
+
+    def next_generation(self):
+        self.generation += 1
+        self.real_time = 0
+        self.simulated_time = 0
+        self.selected_cell = None
+
+        if len(self.alive) and self.evaluator is not None:
+            hidden_layers = self.brains.layer_sizes[1:-1]
+            ranked = self.brains.genomes[evolution.rank(*self.evaluator.scores(self.brains.genomes, self.rng, hidden_layers))]
+        elif len(self.alive):
+            ranked = self.brains.genomes[evolution.rank(self.energy, self.lifetime)]
+        else:
+            ranked = self.brains.random_genomes(1, self.rng)
+        self.top_genomes = ranked[:evolution.parent_count()]
+
+        # All but 2 cells are children of the last generation, the rest are new random cells
+        n_children = max(INITIAL_CELLS - 2, 0)
+        genomes = np.concatenate([evolution.breed(ranked, n_children, self.rng),
+                                  self.brains.random_genomes(INITIAL_CELLS - n_children, self.rng)])
+
+        self.spawn(self.rng.integers(1, self.width - 1, INITIAL_CELLS).astype(float),
+                   self.rng.integers(1, self.height - 1, INITIAL_CELLS).astype(float),
+                   genomes)
+
+        self.scatter_food()
+
+    def immigrate(self, genomes):
+        # Migrants replace the newest rows of the population (the random
+        # newcomers first, then the last children)
+        genomes = genomes[:len(self.brains) - 1]
+        if len(genomes):
+            self.brains.genomes[-len(genomes):] = genomes
+
+    def select_at(self, x, y):
+        found, _ = self.spatial.nearest(x, y, max_radius=SELECT_RADIUS)
+        self.selected_cell = CellView(self, int(found[0])) if len(found) else None
+
+    def center_on_selected(self):
+        if self.selected_cell is not None:
+            i = self.selected_cell.index
+            self.camera.center_on(self.x[i], self.y[i])
+
+    def drawable_arrays(self, ids):
+        # ids come from the spatial hash, which indexes the live cells
+        selected = self.selected_cell.index if self.selected_cell is not None else -1
+        return self.x[ids], self.y[ids], self.energy[ids], self.orientation[ids], ids == selected
+
+    def cell_keys(self, ids):
+        # Each cell keeps its row until the generation ends
+        return np.asarray(ids, dtype=np.int64)
+
+    def cell_count(self):
+        return int(self.alive.sum())
+
+    def get_population_state(self):
+        return {
+            "kind": "array",
+            "x": self.x,
+            "y": self.y,
+            "orientation": self.orientation,
+            "energy": self.energy,
+            "lifetime": self.lifetime,
+            "food_eaten": self.food_eaten,
+            "distance_traveled": self.distance_traveled,
+            "birth_time": self.birth_time,
+            "death_time": self.death_time,
+            "alive": self.alive,
+            "layer_sizes": np.array(self.brains.layer_sizes),
+            "genomes": self.brains.genomes,
+            "top_genomes": self.top_genomes,
+        }
+
+    def set_population_state(self, state):
+        layer_sizes = [int(size) for size in state["layer_sizes"]]
+        self.brains = BrainPool(layer_sizes[0], layer_sizes[-1], layer_sizes[1:-1], state["genomes"].dtype)
+        self.allocate(len(state["x"]))
+        for name in ["x", "y", "orientation", "energy", "lifetime", "food_eaten",
+                     "distance_traveled", "birth_time", "death_time", "alive"]:
+            getattr(self, name)[:] = state[name]
+        self.brains.set_genomes(state["genomes"])
+        self.top_genomes = np.array(state["top_genomes"], dtype=self.brains.dtype)
+
+    def restart(self):
+        self.allocate(0)
+        super().restart()
@@ -0,0 +1,201 @@
+import argparse
+import datetime
+import gc
+import itertools
+import json
+import multiprocessing as mp
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import config
+from sweep import apply_overrides
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+MATRICES = {
+    "quick": {"cells": [100, 1000], "food": [200], "vision": [6], "grid": [(90, 80)]},
+    "full": {"cells": [100, 1000, 10000, 100000], "food": [200, 5000], "vision": [6, 12],
+             "grid": [(90, 80), (400, 400)]},
+}
+# The per-object engine takes minutes per tick beyond this
+OBJECT_ENGINE_MAX_CELLS = 1000
+# Units where a smaller number is the better result
+LOWER_IS_BETTER = ["bytes/cell"]
+
+def measure(fn, min_time):
+    # Calls per second of fn, called until at least min_time has passed
+    fn()  # Warm-up
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls / elapsed
+
+def measure_memory(fn):
+    # Bytes allocated by fn and still held once it returns
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size
+
+def case_overrides(cells, food, vision, grid):
+    width, height = grid
+    return {
+        "INITIAL_CELLS": cells,
+        "INITIAL_FOOD": food,
+        "VISION_RANGE": vision,
+        "WORLD_WIDTH": width,
+        "WORLD_HEIGHT": height,
+        "SEED": 0,
+    }
+
+def run_case(job):
+    # Runs in its own process, so the overrides only apply to this case
+    (cells, food, vision, grid), min_time, with_draw = job
+    apply_overrides(case_overrides(cells, food, vision, grid))
+    from engine import Engine
+    from array_engine import ArrayEngine
+    from cell import NeuralNetwork
+    from tombstones import Tombstones
+
+    params = {"cells": cells, "food": food, "vision": vision, "grid": f"{grid[0]}x{grid[1]}"}
+    results = []
+
+    def add(name, rate, unit):
+        results.append(dict(name=name, **params, rate=rate, unit=unit))
+
+    kinds = [("array", ArrayEngine)]
+    if cells <= OBJECT_ENGINE_MAX_CELLS:
+        kinds.append(("object", Engine))
+
+    for kind, engine_class in kinds:
+        engine = engine_class()
+        engine.initialize()
+        add(f"engine_update[{kind}]", measure(engine.update, min_time), "ticks/s")
+        engine.log_file.close()
+
+        engine = engine_class()
+        engine.initialize()
+        add(f"next_generation[{kind}]", measure(engine.next_generation, min_time), "generations/s")
+        engine.log_file.close()
+
+        # Everything a population of living cells holds, index and brains included
+        engine = engine_class()
+        add(f"memory[{kind}]", measure_memory(lambda: (engine.initialize(), engine.update())) / cells, "bytes/cell")
+
+        if with_draw:
+            import pygame
+            pygame.font.init()
+            screen = pygame.Surface((config.WIDTH, config.HEIGHT))
+            engine.show_vision = True
+            add(f"draw[{kind}]", measure(lambda: engine.draw(screen), min_time), "frames/s")
+        engine.log_file.close()
+
+    engine = ArrayEngine()
+    engine.initialize()
+    idx = np.flatnonzero(engine.alive)
+    add("get_inputs[array]", measure(lambda: engine.get_inputs(idx), min_time) * len(idx), "cells/s")
+    inputs = engine.get_inputs(idx)
+    add("forward[array]", measure(lambda: engine.brains.forward(inputs, idx), min_time) * len(idx), "cells/s")
+    engine.log_file.close()
+
+    if cells <= OBJECT_ENGINE_MAX_CELLS:
+        engine = Engine()
+        engine.initialize()
+        population = engine.cells
+        add("get_inputs[object]", measure(lambda: [cell.get_inputs(engine) for cell in population], min_time)
+            * len(population), "cells/s")
+        network = NeuralNetwork(8, 3, rng=engine.rng)
+        x = population[0].get_inputs(engine)
+        add("forward[object]", measure(lambda: network.forward(x), min_time), "cells/s")
+        # The array engine keeps dead cells in their rows, the object engine as tombstones
+        tombstones = Tombstones()
+        add("memory_dead[object]", measure_memory(lambda: [tombstones.add(cell, 0) for cell in population])
+            / len(population), "bytes/cell")
+        engine.log_file.close()
+
+    return results
+
+def result_key(result):
+    return (result["name"], result["cells"], result["food"], result["vision"], result["grid"])
+
+def compare(results, baseline, tolerance):
+    # Returns the results that got worse than the baseline by more than tolerance
+    baseline_rates = {result_key(result): result["rate"] for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        key = result_key(result)
+        if key not in baseline_rates:
+            continue
+        ratio = result["rate"] / baseline_rates[key]
+        if result["unit"] in LOWER_IS_BETTER:
+            ratio = 1 / ratio
+        flag = ""
+        if ratio < 1 - tolerance:
+            flag = "  REGRESSION"
+            regressions.append(result)
+        print(f"{result['name']:24} cells={result['cells']:<6} food={result['food']:<5} vision={result['vision']:<3} "
+              f"grid={result['grid']:8} {ratio:6.2f}x baseline{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure simulation throughput over a matrix of world sizes.")
+    parser.add_argument("--matrix", choices=list(MATRICES), default="quick")
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to spend on each measurement")
+    parser.add_argument("--no-draw", action="store_true", help="skip the drawing benchmarks (no pygame needed)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="compare against the stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    matrix = MATRICES[args.matrix]
+    cases = list(itertools.product(matrix["cells"], matrix["food"], matrix["vision"], matrix["grid"]))
+    results = []
+    # A fresh process per case, one at a time so cases don't compete for the CPU
+    with mp.Pool(1, maxtasksperchild=1) as pool:
+        for case_results in pool.imap(run_case, [(case, args.min_time, not args.no_draw) for case in cases]):
+            for result in case_results:
+                print(f"{result['name']:24} cells={result['cells']:<6} food={result['food']:<5} "
+                      f"vision={result['vision']:<3} grid={result['grid']:8} {result['rate']:14.1f} {result['unit']}")
+            results.extend(case_results)
+
+    report = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "results": results,
+    }
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    path = os.path.join(BENCHMARK_DIR, f"results_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {BASELINE_PATH}")
+
+    if args.compare:
+        if not os.path.exists(BASELINE_PATH):
+            sys.exit(f"No baseline at {BASELINE_PATH}, run with --save-baseline first")
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than the baseline")
+            sys.exit(1)
+        print("No regressions against the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import numpy as np
+from config import *
+
+class BrainPool:
+    # The brains of a whole population. Every cell's weights live in one row of
+    # `genomes`; `layers` are (N, in, out) views into that buffer, so a forward
+    # pass is one batched matmul per layer instead of one np.dot per cell.
+    def __init__(self, input_size, output_size, hidden_layers=None, dtype=None):
+        if hidden_layers is None:
+            hidden_layers = HIDDEN_LAYERS
+        if dtype is None:
+            dtype = BRAIN_DTYPE
+        self.layer_sizes = [input_size] + list(hidden_layers) + [output_size]
+        self.shapes = list(zip(self.layer_sizes[:-1], self.layer_sizes[1:]))
+        self.genome_length = sum(a * b for a, b in self.shapes)
+        self.dtype = np.dtype(dtype)
+        self.set_genomes(np.zeros((0, self.genome_length), self.dtype))
+
+    def __len__(self):
+        return len(self.genomes)
+
+    def random_genomes(self, n, rng):
+        return rng.standard_normal((n, self.genome_length)).astype(self.dtype)
+
+    def set_genomes(self, genomes):
+        self.genomes = np.ascontiguousarray(genomes, dtype=self.dtype)
+        n = len(self.genomes)
+        self.layers = []
+        offset = 0
+        for a, b in self.shapes:
+            self.layers.append(self.genomes[:, offset:offset + a * b].reshape(n, a, b))
+            offset += a * b
+        self.activations = [np.zeros((n, size), self.dtype) for size in self.layer_sizes]
+
+    def forward(self, X, idx=None):
+        if idx is None:
+            idx = slice(None)
+        # Skip the gather when the whole population is alive
+        elif len(idx) == len(self.genomes):
+            idx = slice(None)
+
+        a = np.asarray(X, dtype=self.dtype)
+        self.activations[0][idx] = a
+        for k, weights in enumerate(self.layers):
+            a = np.tanh(np.matmul(a[:, None, :], weights[idx])[:, 0, :])
+            self.activations[k + 1][idx] = a
+        return a
+
+    def get_weights(self, i):
+        return [weights[i] for weights in self.layers]
+
+    def get_activations(self, i):
+        return [activation[i] for activation in self.activations]
@@ -0,0 +1,81 @@
+import numpy as np
+from config import *
+
+class Camera:
+    # Which part of the wrapping world is shown in the view, an area of the
+    # window of view_width x view_height pixels. (x, y) is the world position
+    # at the top-left of the view and scale the pixels per grid square.
+    def __init__(self, world_width, world_height, view_width, view_height):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.view_width = view_width
+        self.view_height = view_height
+        # Never zoomed out past the whole world, so nothing is on screen twice
+        self.min_scale = max(view_width / world_width, view_height / world_height, CAMERA_MIN_SCALE)
+        self.max_scale = max(CAMERA_MAX_SCALE, self.min_scale)
+        self.reset()
+
+    def reset(self):
+        self.x = 0.0
+        self.y = 0.0
+        self.scale = float(min(max(CELL_SIZE, self.min_scale), self.max_scale))
+
+    def state(self):
+        # Changes whenever the view moves or zooms
+        return (self.x, self.y, self.scale)
+
+    def size(self):
+        # The visible area in grid squares
+        return self.view_width / self.scale, self.view_height / self.scale
+
+    def pan(self, dx, dy):
+        # Moves the view by dx, dy pixels
+        self.x = (self.x + dx / self.scale) % self.world_width
+        self.y = (self.y + dy / self.scale) % self.world_height
+
+    def zoom(self, factor, px=None, py=None):
+        # Zooms by factor, keeping the world position under view pixel (px, py) in place
+        if px is None:
+            px, py = self.view_width / 2, self.view_height / 2
+        x, y = self.to_world(px, py)
+        self.scale = min(max(self.scale * factor, self.min_scale), self.max_scale)
+        self.x = (x - px / self.scale) % self.world_width
+        self.y = (y - py / self.scale) % self.world_height
+
+    def center_on(self, x, y):
+        width, height = self.size()
+        self.x = (x - width / 2) % self.world_width
+        self.y = (y - height / 2) % self.world_height
+
+    def to_world(self, px, py):
+        # World position at view pixel (px, py)
+        return ((self.x + px / self.scale) % self.world_width,
+                (self.y + py / self.scale) % self.world_height)
+
+    def click_position(self, mouse_pos):
+        # World position of a cell drawn under the mouse, or None outside the
+        # view. The view sits below the LABEL_HEIGHT header and cells are drawn
+        # half a square in from their position.
+        x, y = mouse_pos[0], mouse_pos[1] - LABEL_HEIGHT
+        if not (0 <= x < self.view_width and 0 <= y < self.view_height):
+            return None
+        x, y = self.to_world(x, y)
+        return x - 0.5, y - 0.5
+
+    def offsets(self, x, y, margin=1):
+        # Distances in squares from the top-left of the view to world
+        # positions, across the wrapping edges. Positions outside the view up
+        # to margin squares above or left of it come out negative.
+        width, height = self.size()
+        dx = (np.asarray(x) - self.x) % self.world_width
+        dy = (np.asarray(y) - self.y) % self.world_height
+        dx = np.where(dx >= max(self.world_width - margin, width), dx - self.world_width, dx)
+        dy = np.where(dy >= max(self.world_height - margin, height), dy - self.world_height, dy)
+        return dx, dy
+
+    def columns(self, px):
+        # World column shown at each view pixel column
+        return np.floor(self.x + (np.asarray(px) + 0.5) / self.scale).astype(np.int64) % self.world_width
+
+    def rows(self, py):
+        return np.floor(self.y + (np.asarray(py) + 0.5) / self.scale).astype(np.int64) % self.world_height
@@ -1,14 +1,45 @@
-import pygame
 import numpy as np
 from config import *
 
+INPUT_LABELS = ["Energy", "Orient", "V1 Dist", "V1 Type", "V2 Dist", "V2 Type", "V3 Dist", "V3 Type"]
+OUTPUT_LABELS = ["Rotate CW", "Rotate CCW", "Move"]
+GENOME_LENGTH = len(INPUT_LABELS) * len(OUTPUT_LABELS)
+
+def arc_points(x, y, orientation, turn, step, speed):
+    # A tick of length speed stands for ticks = ceil(speed) sub-ticks of
+    # length speed / ticks, each turning by turn and then moving by step
+    # times that length, with the brain's outputs held. Rather than one
+    # straight jump, the cell follows the arc through the points those
+    # sub-ticks reach. Returns them, with the last where the cell ends, as
+    # (..., ticks) arrays. orientation is the heading after all the turning.
+    # At a whole-number speed the sub-ticks are plain ticks; at speed 1 or
+    # less this is one straight move along orientation.
+    ticks = max(int(np.ceil(speed)), 1)
+    length = speed / ticks
+    j = np.arange(1, ticks + 1)
+    half = np.radians(np.asarray(turn, dtype=float))[..., None] * length / 2
+    # j moves turning 2 * half apart add up to sin(j half) / sin(half) moves
+    # in the direction of the middle one
+    turning = half != 0
+    reach = np.where(turning, np.sin(j * half) / np.where(turning, np.sin(half), 1), j)
+    heading = np.radians(np.asarray(orientation, dtype=float))[..., None] - half * (2 * ticks - j - 1)
+    step = np.asarray(step, dtype=float)[..., None] * length * reach
+    return (np.asarray(x, dtype=float)[..., None] + np.cos(heading) * step,
+            np.asarray(y, dtype=float)[..., None] + np.sin(heading) * step)
+
 class Cell:
-    def __init__(self, x, y, weights=None):
+    # Slots instead of a __dict__: a large population holds a lot of these
+    __slots__ = ("x", "y", "energy", "orientation", "brain", "lifetime", "last_inputs", "last_outputs",
+                 "food_eaten", "distance_traveled", "birth_time", "death_time")
+
+    def __init__(self, x, y, weights=None, rng=None, orientation=None):
+        if rng is None and (weights is None or orientation is None):
+            rng = np.random.default_rng()
         self.x = x
         self.y = y
         self.energy = CELL_ENERGY_MAX
-        self.orientation = np.random.rand() * 360
-        self.brain = NeuralNetwork(8, 3, weights)
+        self.orientation = rng.random() * 360 if orientation is None else orientation
+        self.brain = NeuralNetwork(8, 3, weights, rng)
         self.lifetime = 0
         self.last_inputs = None
         self.last_outputs = None
@@ -18,11 +49,13 @@ class Cell:
         self.death_time = None  # Time when the cell died (None if still alive)
 
     def draw(self, screen):
+        import pygame
         color = tuple(int(c * (1 - self.energy / CELL_ENERGY_MAX) + g * (self.energy / CELL_ENERGY_MAX)) for c, g in zip(RED, GREEN))
         pygame.draw.circle(screen, color, (int(self.x * CELL_SIZE + CELL_SIZE // 2), 
                                            int(self.y * CELL_SIZE + CELL_SIZE // 2)), CELL_SIZE // 2)
 
     def draw_vision(self, screen):
+        import pygame
         for angle in [-30, 0, 30]:
             vision_angle = (self.orientation + angle) % 360
             end_x = self.x * CELL_SIZE + np.cos(np.radians(vision_angle)) * VISION_RANGE * CELL_SIZE
@@ -34,9 +67,18 @@ class Cell:
     def update(self, environment, speed):
         self.lifetime += 1 #/ speed  # Adjust lifetime based on speed
         self.energy -= CELL_IDLE_COST * speed
-        self.last_inputs = self.get_inputs(environment)
-        self.last_outputs = self.brain.forward(self.last_inputs)
-        self.process_outputs(self.last_outputs, environment, speed)
+        profiler = environment.profiler
+        inputs = self.get_inputs(environment)
+        profiler.lap("sensing")
+        outputs = self.brain.forward(inputs)
+        profiler.lap("inference")
+        # Only the info panel reads these, and only for the selected cell
+        if self is environment.selected_cell:
+            self.last_inputs, self.last_outputs = inputs, outputs
+        path = self.process_outputs(outputs, environment, speed)
+        profiler.lap("actuation")
+        if self.energy > 0:
+            environment.eat_along(self, *path)
         return self.energy > 0
     
     def die(self, current_time):
@@ -56,16 +98,15 @@ class Cell:
         }
 
     def get_neuron_activations(self):
-        input_labels = ["Energy", "Orient", "V1 Dist", "V1 Type", "V2 Dist", "V2 Type", "V3 Dist", "V3 Type"]
-        output_labels = ["Rotate CW", "Rotate CCW", "Move"]
         return {
-            "inputs": list(zip(input_labels, self.last_inputs)) if self.last_inputs is not None else [],
-            "outputs": list(zip(output_labels, self.last_outputs)) if self.last_outputs is not None else []
+            "inputs": list(zip(INPUT_LABELS, self.last_inputs)) if self.last_inputs is not None else [],
+            "outputs": list(zip(OUTPUT_LABELS, self.last_outputs)) if self.last_outputs is not None else []
         }
 
     def get_inputs(self, environment):
         inputs = np.array([self.energy / CELL_ENERGY_MAX, self.orientation / 360])
         vision_inputs = np.zeros(6)
+        probes = 0
         for i, angle in enumerate([-30, 0, 30]):
             vision_angle = (self.orientation + angle) % 360
             dx = np.cos(np.radians(vision_angle))
@@ -81,48 +122,48 @@ class Cell:
                     break
             else:
                 vision_inputs[i*2:i*2+2] = [-1, -1]
+            probes += j
+        environment.profiler.count("food_probes", probes)
         return np.concatenate([inputs, vision_inputs])
 
     def process_outputs(self, outputs, environment, speed):
+        # Returns the points the cell passed through, ending where it is now
         rotate_cw, rotate_ccw, move = outputs
 
+        turn = 0
         if rotate_cw > 0.5:
             self.orientation += 10 * speed
             self.energy -= CELL_ROTATE_COST * speed
+            turn += 10
         if rotate_ccw > 0.5:
             self.orientation -= 10 * speed
             self.energy -= CELL_ROTATE_COST * speed
+            turn -= 10
+        path = ([self.x], [self.y])
         if move > 0.5:
-            dx = np.cos(np.radians(self.orientation)) * 0.1 * speed
-            dy = np.sin(np.radians(self.orientation)) * 0.1 * speed
-            new_x = (self.x + dx) % environment.width
-            new_y = (self.y + dy) % environment.height
-            self.distance_traveled += np.sqrt(dx**2 + dy**2)
-            self.x, self.y = new_x, new_y
+            if speed == 1:
+                dx = np.cos(np.radians(self.orientation)) * 0.1
+                dy = np.sin(np.radians(self.orientation)) * 0.1
+                path = ([(self.x + dx) % environment.width], [(self.y + dy) % environment.height])
+            else:
+                x, y = arc_points(self.x, self.y, self.orientation, turn, 0.1, speed)
+                path = (x % environment.width, y % environment.height)
+            self.x, self.y = path[0][-1], path[1][-1]
+            self.distance_traveled += 0.1 * speed
             self.energy -= CELL_MOVE_COST * speed
 
         self.orientation %= 360
         self.energy = max(CELL_ENERGY_MIN, min(CELL_ENERGY_MAX, self.energy))
-
-    def reproduce(self):
-        child_weights = self.brain.weights.copy()
-        
-        # Generate random values between -0.5 and 0.5
-        t = np.random.uniform(-0.5, 0.5, child_weights.shape)
-        
-        # Create mask for mutation
-        mask = np.abs(t) < MUTATION_RATE / 2
-        
-        # Apply mutations
-        mutations = np.random.normal(0, MUTATION_AMOUNT, mask.sum())
-        child_weights[mask] += mutations
-        
-        return Cell(self.x, self.y, child_weights)
+        return path
 
 class NeuralNetwork:
-    def __init__(self, input_size, output_size, weights=None):
+    __slots__ = ("weights",)
+
+    def __init__(self, input_size, output_size, weights=None, rng=None):
         if weights is None:
-            self.weights = np.random.randn(input_size, output_size)
+            if rng is None:
+                rng = np.random.default_rng()
+            self.weights = rng.standard_normal((input_size, output_size))
         else:
             self.weights = weights
 
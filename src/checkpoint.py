@@ -0,0 +1,94 @@
+import glob
+import os
+import queue
+import threading
+import numpy as np
+from config import *
+from engine import Engine
+from array_engine import ArrayEngine
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'checkpoints')
+
+def snapshot(engine):
+    # Copy the engine state (including its random generator) so the copy can
+    # be written out while the simulation keeps running
+    return {name: np.array(value, copy=True) for name, value in engine.get_state().items()}
+
+def write(state, path):
+    # Write to a temporary file first so a crash mid-write never leaves a
+    # broken checkpoint behind
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **state)
+    os.replace(tmp_path, path)
+
+def save(engine, path):
+    write(snapshot(engine), path)
+
+def load(path):
+    with np.load(path) as data:
+        state = {name: data[name] for name in data.files}
+
+    engine = ArrayEngine() if str(state["kind"]) == "array" else Engine()
+    engine.set_state(state)
+    return engine
+
+def run_directory(engine, directory=CHECKPOINT_DIR):
+    # Each run keeps its checkpoints in a directory named after its stats log,
+    # so runs going at the same time never prune each other's
+    return os.path.join(directory, os.path.splitext(os.path.basename(engine.log_file.name))[0])
+
+def latest_checkpoint(directory=CHECKPOINT_DIR):
+    paths = (glob.glob(os.path.join(directory, "*", "checkpoint_*.npz"))
+             + glob.glob(os.path.join(directory, "checkpoint_*.npz")))
+    return max(paths, key=os.path.getmtime) if paths else None
+
+class Checkpointer:
+    # Saves a snapshot every CHECKPOINT_INTERVAL generations. The snapshot is
+    # taken on the caller's thread, the file is written on a background thread.
+    # Only the last CHECKPOINTS_KEPT of the engine's own run are kept.
+    def __init__(self, directory=CHECKPOINT_DIR, interval=None, keep=None):
+        self.directory = directory
+        self.interval = CHECKPOINT_INTERVAL if interval is None else interval
+        self.keep = CHECKPOINTS_KEPT if keep is None else keep
+        self.last_generation = None
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self.writer, daemon=True)
+        self.thread.start()
+
+    def on_generation(self, engine):
+        if self.interval <= 0 or engine.generation == self.last_generation:
+            return
+        if engine.generation % self.interval == 0:
+            self.last_generation = engine.generation
+            self.save(engine)
+
+    def save(self, engine):
+        path = os.path.join(run_directory(engine, self.directory), f"checkpoint_{engine.generation:06d}.npz")
+        # Waits for the previous write if it is still going
+        self.queue.put((snapshot(engine), path))
+
+    def writer(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            state, path = item
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                write(state, path)
+                self.prune(os.path.dirname(path))
+            except OSError as e:
+                print(f"Failed to write checkpoint {path}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def prune(self, directory):
+        paths = sorted(glob.glob(os.path.join(directory, "checkpoint_*.npz")), key=os.path.getmtime)
+        for path in paths[:-self.keep] if self.keep > 0 else []:
+            os.remove(path)
+
+    def close(self):
+        self.queue.join()
+        self.queue.put(None)
+        self.thread.join()
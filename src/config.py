@@ -14,13 +14,28 @@ GREY = (128, 128, 128)
 DARK_BLUE = (0, 0, 128)
 LIGHT_BLUE = (173, 216, 230)
 
+# Rendering settings
+DIRTY_RECT_LIMIT = 300  # Above this many changed areas per frame the whole window is redrawn instead
+VISION_DRAW_BATCH = 10000  # Cells whose vision rays are drawn together, bounds the memory used
+CAMERA_MIN_SCALE = 1  # Pixels per grid square when zoomed all the way out, unless the whole world fits sooner
+CAMERA_MAX_SCALE = 40  # Pixels per grid square when zoomed all the way in
+CAMERA_ZOOM_STEP = 1.25  # Zoom factor per mouse wheel notch
+CAMERA_PAN_STEP = 0.25  # Part of the view moved per arrow key press
+
 # Simulation settings
 FPS = 60
-SIMULATION_SPEEDS = [0.5, 1, 2, 4, 8]
+SIMULATION_SPEEDS = [0.5, 1, 2, 4, 8]  # Fixed-size ticks per frame
+TURBO_FPS = 4  # Frames drawn per second in turbo mode, the rest of the time is spent simulating
+WORLD_WIDTH = None  # World size in grid squares, None to fit the window at CELL_SIZE pixels per square
+WORLD_HEIGHT = None
 INITIAL_CELLS = 100
 INITIAL_FOOD = 200
 GENERATION_TIME = 60
 RESPAWN_FOOD = False
+SEED = None  # Seed for the engine's random generator, None for a different run every time
+USE_ARRAY_ENGINE = False  # Run the population as NumPy arrays (faster for large populations)
+STATS_LOG_BATCH = 64  # Generations buffered before the stats log is written out
+STATS_LOG_FLUSH_SECONDS = 5  # ...or after this long, whichever comes first
 
 # Cell settings
 CELL_ENERGY_MAX = 100
@@ -30,9 +45,53 @@ CELL_ROTATE_COST = 0.025
 CELL_IDLE_COST = 0.08
 FOOD_ENERGY = 20
 
+# Brain settings (used by ArrayEngine)
+HIDDEN_LAYERS = []  # Sizes of the hidden layers between the 8 inputs and 3 outputs, e.g. [8, 8]
+BRAIN_DTYPE = "float32"
+
+# Food settings
+FOOD_REGROWTH = "none"  # "none", "rate" (everywhere), "patchy" (around a few fertile spots) or "seasonal"
+FOOD_REGROWTH_RATE = 0.001  # Chance per second that an empty square grows food
+FOOD_PATCHES = 4  # Fertile spots for "patchy" regrowth, placed anew every generation
+FOOD_PATCH_RADIUS = 6
+FOOD_SEASON_LENGTH = 120  # Seconds per cycle of "seasonal" regrowth, from none to twice the rate
+FOOD_CARRY_OVER = False  # Keep the food between generations instead of scattering INITIAL_FOOD again
+
+# Spatial index settings
+SPATIAL_BUCKET_SIZE = 4  # Side of a spatial hash bucket, in grid squares
+SELECT_RADIUS = 2.5  # How far from a click (in grid squares) a cell can be selected
+
 # Mutation settings
 MUTATION_RATE = 0.08
 MUTATION_AMOUNT = 0.2
 
+# Selection settings (evolution.py)
+SELECTION = "truncation"  # "truncation" (the best TRUNCATION_FRACTION of INITIAL_CELLS), "tournament" or "rank"
+TRUNCATION_FRACTION = 0.1
+TOURNAMENT_SIZE = 3
+CROSSOVER_RATE = 0  # Share of children that mix the genes of two parents, 0 for mutation only
+
+# Evaluation settings (evaluation.py)
+EVALUATION_EPISODES = 0  # Episodes with fresh food that score each generation before breeding, 0 to rank by the generation itself
+EVALUATION_WORKERS = None  # Processes to run the episodes on, None for one per core
+
+# Checkpoint settings (checkpoint.py)
+CHECKPOINT_INTERVAL = 10  # Generations between checkpoints, 0 to disable
+CHECKPOINTS_KEPT = 3
+
+# Telemetry settings (telemetry.py, viewer.py)
+TELEMETRY_HOST = "127.0.0.1"  # "0.0.0.0" to let viewers on other machines connect
+TELEMETRY_PORT = 8765
+TELEMETRY_FPS = 20  # Frames per second sent to each viewer at most
+TELEMETRY_BUFFER_BYTES = 1 << 20  # Unsent bytes per viewer before its frames are dropped
+TELEMETRY_STATS_KEPT = 1000  # Per-generation stats queued for a slow viewer
+
+# Island settings (islands.py)
+ISLANDS = 4
+MIGRATION_INTERVAL = 5  # Generations between migrations
+MIGRANTS = 2  # Top genomes each island sends per migration
+MIGRATION_TOPOLOGY = "ring"  # "ring" or "full"
+
 # Vision settings
-VISION_RANGE = 6
\ No newline at end of file
+VISION_RANGE = 6
+VISION_ANGLE_STEPS = 360  # Orientations precomputed in the ArrayEngine ray tables
\ No newline at end of file
@@ -1,232 +1,241 @@
-import pygame
-import random
 import numpy as np
 import os
+import json
 import datetime
 from config import *
 from wall import Wall
-from food import Food
-from cell import Cell
+from food import FoodField
+from cell import Cell, INPUT_LABELS, OUTPUT_LABELS, GENOME_LENGTH
+from tombstones import Tombstones, RECORD_DTYPE
+from profiler import Profiler
+from stats_log import StatsLog, generation_row
+from spatial import SpatialHash
+from camera import Camera
+import evolution
+
+def log_path(prefix, extension="log"):
+    log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
+    if not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Runs started in the same second (e.g. by sweep.py) each get their own
+    # file: the name is claimed by creating it before it is returned
+    for n in range(1, 1000):
+        name = f"{prefix}_{timestamp}.{extension}" if n == 1 else f"{prefix}_{timestamp}_{n}.{extension}"
+        path = os.path.join(log_dir, name)
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL))
+            return path
+        except FileExistsError:
+            pass
+    raise FileExistsError(f"No free log name for {prefix}_{timestamp}")
+
+def open_log_file(prefix):
+    return open(log_path(prefix), "w")
 
 class Engine:
-    def __init__(self):
-        self.width = (WIDTH - INFO_PANEL_WIDTH) // CELL_SIZE
-        self.height = (HEIGHT - LABEL_HEIGHT - BUTTON_AREA_HEIGHT) // CELL_SIZE
-        self.foods = set()
+    def __init__(self, seed=None):
+        # All randomness comes from this generator, so a seed gives the same run every time
+        self.seed = SEED if seed is None else seed
+        self.rng = np.random.default_rng(self.seed)
+        self.width = WORLD_WIDTH or (WIDTH - INFO_PANEL_WIDTH) // CELL_SIZE
+        self.height = WORLD_HEIGHT or (HEIGHT - LABEL_HEIGHT - BUTTON_AREA_HEIGHT) // CELL_SIZE
+        self.food = FoodField(self.width, self.height)
         self.cells = []
-        self.dead_cells = []
+        self.tombstones = Tombstones()  # Cells that died this generation
+        self.top_genomes = np.empty((0, GENOME_LENGTH))  # Parents of the current generation, best first
         self.generation = 1
         self.time = 0
         self.show_vision = False
         self.speed = 1
-        self.cell_positions = {}
-        self.food_positions = {}
+        self.spatial = SpatialHash(self.width, self.height)  # All cells, for neighbour queries
         self.selected_cell = None
         self.paused = False
         self.stats = {"avg_lifespan": 0, "avg_food_eaten": 0, "avg_distance": 0, "remaining_food": 0}
         self.log_file = self.create_log_file()
         self.real_time = 0  # track real time
         self.simulated_time = 0  # track simulated time
+        self.renderer = None
+        self.camera = self.create_camera()
+        self.profiler = Profiler()
+        self.evaluator = self.create_evaluator()
 
-    def create_log_file(self):
-        log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        return open(os.path.join(log_dir, f"simulation_{timestamp}.log"), "w")
+    def create_evaluator(self):
+        if EVALUATION_EPISODES <= 0:
+            return None
+        # evaluation.py builds on ArrayEngine, so it can't be imported at the top
+        from evaluation import Evaluator
+        return Evaluator()
+
+    def create_camera(self):
+        return Camera(self.width, self.height, WIDTH - INFO_PANEL_WIDTH, HEIGHT - LABEL_HEIGHT - BUTTON_AREA_HEIGHT)
 
-    def add_food(self, x, y):
-        food = Food(x, y)
-        self.foods.add(food)
-        self.food_positions[(int(x), int(y))] = food
+    def create_log_file(self):
+        return StatsLog(log_path("simulation", "stats"))
+
+    def initial_food(self):
+        self.food.clear()
+        self.food.add(*self.rng.uniform(0, [self.width, self.height], size=(INITIAL_FOOD, 2)).T)
+        if self.food.regrowth == "patchy":
+            self.food.place_patches(self.rng)
+
+    def scatter_food(self):
+        # Fresh food for a new generation, unless FOOD_CARRY_OVER keeps the old
+        if not FOOD_CARRY_OVER:
+            self.food.clear()
+            self.food.add(*self.rng.integers(1, [self.width - 1, self.height - 1], size=(INITIAL_FOOD, 2)).T)
+        if self.food.regrowth == "patchy":
+            self.food.place_patches(self.rng)
 
     def add_cell(self, x, y):
-        cell = Cell(x, y)
+        cell = Cell(x, y, rng=self.rng)
         cell.birth_time = self.simulated_time
         self.cells.append(cell)
-        self.cell_positions[(int(x), int(y))] = cell
 
     def is_food(self, x, y):
-        return (int(x) % self.width, int(y) % self.height) in self.food_positions
+        return self.food.grid[int(x) % self.width, int(y) % self.height]
 
-    def update(self):
+    def update(self, speed=None):
+        # speed scales the size of this tick; the scheduler passes 1 and runs more ticks instead
+        if speed is None:
+            speed = self.speed
         if not self.paused:
             self.real_time += 1 / FPS
-            self.simulated_time += (1 / FPS) * self.speed
-            new_cells = []
-            self.cell_positions.clear()
-
-            for cell in self.cells:
-                if cell.update(self, self.speed):
-                    new_cells.append(cell)
-                    new_pos = (int(cell.x) % self.width, int(cell.y) % self.height)
-                    self.cell_positions[new_pos] = cell
-                    
-                    if new_pos in self.food_positions:
-                        cell.energy = min(CELL_ENERGY_MAX, cell.energy + FOOD_ENERGY)
-                        cell.food_eaten += 1
-                        food_to_remove = self.food_positions.pop(new_pos)
-                        self.foods.remove(food_to_remove)
-                        if RESPAWN_FOOD:
-                            self.add_food(random.randint(0, self.width - 1), random.randint(0, self.height - 1))
-                else:
-                    cell.die(self.simulated_time)
-                    self.dead_cells.append(cell)
-                    if cell == self.selected_cell:
-                        self.selected_cell = None
-
-            self.cells = new_cells
-
-            if self.simulated_time >= GENERATION_TIME or len(self.cells) == 0:
+            self.simulated_time += (1 / FPS) * speed
+            self.profiler.count("ticks")
+            self.step_cells(speed)
+
+            if self.generation_over():
+                self.profiler.start()
                 self.calculate_stats()
                 self.log_stats()
                 self.next_generation()
+                self.profiler.lap("generation")
+
+            self.index_cells()
+            self.profiler.lap("spatial")
+
+    def step_cells(self, speed):
+        new_cells = []
+        self.profiler.count("cells_processed", len(self.cells))
+        self.profiler.start()
+
+        for cell in self.cells:
+            if cell.update(self, speed):
+                new_cells.append(cell)
+            else:
+                self.tombstones.add(cell, self.simulated_time)
+                if cell == self.selected_cell:
+                    self.selected_cell = None
+            self.profiler.lap("food")
+
+        self.cells = new_cells
+        self.food.regrow((1 / FPS) * speed, self.simulated_time, self.rng)
+        self.profiler.lap("food")
+
+    def eat_along(self, cell, path_x, path_y):
+        # The cell eats the food on every square it passed through this tick
+        last = None
+        for x, y in zip(path_x, path_y):
+            square = (int(x) % self.width, int(y) % self.height)
+            if square != last and self.food.grid[square]:
+                cell.energy = min(CELL_ENERGY_MAX, cell.energy + FOOD_ENERGY)
+                cell.food_eaten += 1
+                self.food.remove(*square)
+                if RESPAWN_FOOD:
+                    self.food.add(self.rng.integers(0, self.width), self.rng.integers(0, self.height))
+            last = square
+
+    def generation_over(self):
+        return self.simulated_time >= GENERATION_TIME or len(self.cells) == 0
+
+    def index_cells(self):
+        # Rebuilds the spatial index from the current positions
+        self.spatial.rebuild(np.fromiter((cell.x for cell in self.cells), float, len(self.cells)),
+                             np.fromiter((cell.y for cell in self.cells), float, len(self.cells)))
 
     def calculate_stats(self):
-        all_cells = self.cells + self.dead_cells
-        if all_cells:
-            self.stats["avg_lifespan"] = sum(cell.get_lifespan(self.simulated_time) for cell in all_cells) / len(all_cells)
-            self.stats["avg_food_eaten"] = sum(cell.food_eaten for cell in all_cells) / len(all_cells)
-            self.stats["avg_distance"] = sum(cell.distance_traveled for cell in all_cells) / len(all_cells)
+        # Living cells first, then the dead, summed in order like a single list
+        dead = self.tombstones
+        n = len(self.cells) + len(dead)
+        if n:
+            self.stats["avg_lifespan"] = sum(dead.lifespans().tolist(), sum(cell.get_lifespan(self.simulated_time) for cell in self.cells)) / n
+            self.stats["avg_food_eaten"] = sum(dead.field("food_eaten").tolist(), sum(cell.food_eaten for cell in self.cells)) / n
+            self.stats["avg_distance"] = sum(dead.field("distance_traveled").tolist(), sum(cell.distance_traveled for cell in self.cells)) / n
         else:
             self.stats["avg_lifespan"] = 0
             self.stats["avg_food_eaten"] = 0
             self.stats["avg_distance"] = 0
-        self.stats["remaining_food"] = len(self.foods)
+        self.stats["remaining_food"] = self.food.count()
+
+    def generation_values(self):
+        # Per-individual values of the generation that just ended, for the stats log.
+        # Fitness is the lifetime that next_generation ranks by.
+        return {
+            "lifespan": self.population_values(lambda cell: cell.get_lifespan(self.simulated_time), self.tombstones.lifespans()),
+            "food_eaten": self.population_values(lambda cell: cell.food_eaten, self.tombstones.field("food_eaten")),
+            "distance": self.population_values(lambda cell: cell.distance_traveled, self.tombstones.field("distance_traveled")),
+            "fitness": self.population_values(lambda cell: cell.lifetime, self.tombstones.field("lifetime")),
+            "survivors": len(self.cells),
+        }
+
+    def population_values(self, value, dead_values, dtype=float):
+        # One value per cell of the generation, living cells first
+        return np.concatenate([np.fromiter((value(cell) for cell in self.cells), dtype, len(self.cells)),
+                               np.asarray(dead_values, dtype)])
 
     def log_stats(self):
-        log_entry = f"Generation {self.generation}: "
-        log_entry += f"Avg Lifespan: {self.stats['avg_lifespan']:.2f}, "
-        log_entry += f"Avg Food Eaten: {self.stats['avg_food_eaten']:.2f}, "
-        log_entry += f"Avg Distance: {self.stats['avg_distance']:.2f}, "
-        log_entry += f"Remaining Food: {self.stats['remaining_food']}\n"
-        self.log_file.write(log_entry)
-        self.log_file.flush()
+        self.log_file.append(generation_row(self.generation, self.stats, self.generation_values()))
 
     def draw(self, screen):
-        screen.fill(WHITE)
-        for food in self.foods:
-            pygame.draw.rect(screen, DARK_BLUE, (food.x * CELL_SIZE, food.y * CELL_SIZE + LABEL_HEIGHT, CELL_SIZE, CELL_SIZE))
-        for cell in self.cells:
-            color = tuple(int(c * (1 - cell.energy / CELL_ENERGY_MAX) + g * (cell.energy / CELL_ENERGY_MAX)) for c, g in zip(RED, GREEN))
-            cell_center = (int(cell.x * CELL_SIZE + CELL_SIZE // 2) % (self.width * CELL_SIZE), 
-                           int(cell.y * CELL_SIZE + CELL_SIZE // 2) % (self.height * CELL_SIZE) + LABEL_HEIGHT)
-            pygame.draw.circle(screen, color, cell_center, CELL_SIZE // 2)
-            
-            # Draw a black circle around the selected cell
-            if cell == self.selected_cell:
-                pygame.draw.circle(screen, BLACK, cell_center, CELL_SIZE * 0.75 + 2, 2)
-                
-            if self.show_vision:
-                for angle in [-30, 0, 30]:
-                    vision_angle = (cell.orientation + angle) % 360
-                    end_x = (cell.x + np.cos(np.radians(vision_angle)) * VISION_RANGE) % self.width
-                    end_y = (cell.y + np.sin(np.radians(vision_angle)) * VISION_RANGE) % self.height
-                    
-                    # Calculate intermediate points for drawing
-                    steps = 20  # Increase the number of steps for smoother lines
-                    for i in range(steps):
-                        start_x = (cell.x + i * np.cos(np.radians(vision_angle)) * VISION_RANGE / steps) % self.width
-                        start_y = (cell.y + i * np.sin(np.radians(vision_angle)) * VISION_RANGE / steps) % self.height
-                        end_x = (cell.x + (i+1) * np.cos(np.radians(vision_angle)) * VISION_RANGE / steps) % self.width
-                        end_y = (cell.y + (i+1) * np.sin(np.radians(vision_angle)) * VISION_RANGE / steps) % self.height
-                        
-                        # Check if the line segment crosses the map boundary
-                        if (abs(end_x - start_x) < self.width / 2 and 
-                            abs(end_y - start_y) < self.height / 2):
-                            pygame.draw.line(screen, GREY, 
-                                            (int(start_x * CELL_SIZE + CELL_SIZE // 2), 
-                                            int(start_y * CELL_SIZE + CELL_SIZE // 2) + LABEL_HEIGHT),
-                                            (int(end_x * CELL_SIZE + CELL_SIZE // 2), 
-                                            int(end_y * CELL_SIZE + CELL_SIZE // 2) + LABEL_HEIGHT), 1)
-
-        font = pygame.font.Font(None, 36)
-        info_text = f"Cells: {len(self.cells)} | Food: {len(self.foods)} | Generation: {self.generation} | Time: {self.simulated_time:.1f}"
-        text_surface = font.render(info_text, True, GREY)
-        screen.blit(text_surface, (10, 10))
-
-        self.draw_info_panel(screen)
-
-    def draw_info_panel(self, screen):
-        panel_rect = pygame.Rect(WIDTH - INFO_PANEL_WIDTH, 0, INFO_PANEL_WIDTH, HEIGHT)
-        pygame.draw.rect(screen, LIGHT_BLUE, panel_rect)
-
-        if self.selected_cell:
-            self.draw_cell_info(screen, self.selected_cell)
-            self.draw_neural_network(screen, self.selected_cell)
-
-        # Draw stats
-        font = pygame.font.Font(None, 24)
-        y = HEIGHT - 120
-        for stat, value in self.stats.items():
-            text = font.render(f"{stat.replace('_', ' ').title()}: {value:.2f}", True, BLACK)
-            screen.blit(text, (WIDTH - INFO_PANEL_WIDTH + 10, y))
-            y += 30
-
-    def draw_neural_network(self, screen, cell):
-        activations = cell.get_neuron_activations()
-        weights = cell.brain.get_weights()
-
-        input_y = 200
-        output_y = 200
-        input_x = WIDTH - INFO_PANEL_WIDTH + 50
-        output_x = WIDTH - 50
-
-        for i, (label, value) in enumerate(activations["inputs"]):
-            color = tuple(int(255 * abs(value)) for _ in range(3))
-            pygame.draw.circle(screen, color, (input_x, input_y + i * 30), 10)
-            text = pygame.font.Font(None, 20).render(label, True, BLACK)
-            screen.blit(text, (input_x - 40, input_y + i * 30 - 5))
-
-        for j, (label, value) in enumerate(activations["outputs"]):
-            color = tuple(int(255 * abs(value)) for _ in range(3))
-            pygame.draw.circle(screen, color, (output_x, output_y + j * 100), 10)
-            text = pygame.font.Font(None, 20).render(label, True, BLACK)
-            screen.blit(text, (output_x + 15, output_y + j * 100 - 5))
-
-        for i in range(len(activations["inputs"])):
-            for j in range(len(activations["outputs"])):
-                weight = weights[i, j]
-                width = int(abs(weight) * 5)
-                color = tuple(int(255 * (abs(activations["inputs"][i][1]) + abs(activations["outputs"][j][1])) / 2) for _ in range(3))
-                pygame.draw.line(screen, color, (input_x + 10, input_y + i * 30), 
-                                 (output_x - 10, output_y + j * 100), width)
-    def draw_cell_info(self, screen, cell):
-        font = pygame.font.Font(None, 24)
-        y = 10
-        for key, value in cell.get_info().items():
-            text = font.render(f"{key}: {value}", True, BLACK)
-            screen.blit(text, (WIDTH - INFO_PANEL_WIDTH + 10, y))
-            y += 30
+        # pygame is only needed for drawing, so headless runs never import it
+        if self.renderer is None:
+            from renderer import Renderer
+            self.renderer = Renderer(self)
+        self.profiler.start()
+        dirty = self.renderer.draw(screen)
+        self.profiler.lap("draw")
+        return dirty
+
+    def drawable_arrays(self, ids):
+        # x, y, energy, orientation and whether selected, for the cells with
+        # these ids from the spatial hash
+        cells = [self.cells[i] for i in ids.tolist()]
+        return (np.fromiter((cell.x for cell in cells), float, len(cells)),
+                np.fromiter((cell.y for cell in cells), float, len(cells)),
+                np.fromiter((cell.energy for cell in cells), float, len(cells)),
+                np.fromiter((cell.orientation for cell in cells), float, len(cells)),
+                np.fromiter((cell is self.selected_cell for cell in cells), bool, len(cells)))
+
+    def cell_keys(self, ids):
+        # A number for each of these cells that stays the same until the
+        # generation ends. Cells are never created mid-generation, so the
+        # identity of the living objects serves.
+        return np.fromiter((id(self.cells[i]) for i in ids.tolist()), np.int64, len(ids))
+
+    def cell_count(self):
+        return len(self.cells)
 
     def select_cell(self, mouse_pos):
-        x, y = mouse_pos
-        grid_x = x // CELL_SIZE
-        grid_y = (y - LABEL_HEIGHT) // CELL_SIZE
-        
-        nearest_cell = None
-        nearest_distance = float('inf')
-
-        # Check cells in a 5x5 area around the clicked position
-        for dx in range(-2, 3):
-            for dy in range(-2, 3):
-                check_x = (grid_x + dx) % self.width
-                check_y = (grid_y + dy) % self.height
-                if (check_x, check_y) in self.cell_positions:
-                    cell = self.cell_positions[(check_x, check_y)]
-                    distance = (cell.x - grid_x)**2 + (cell.y - grid_y)**2
-                    if distance < nearest_distance:
-                        nearest_cell = cell
-                        nearest_distance = distance
-
-        self.selected_cell = nearest_cell
+        position = self.camera.click_position(mouse_pos)
+        if position is not None:
+            self.select_at(*position)
+
+    def select_at(self, x, y):
+        # Selects the cell nearest to world position (x, y), if one is close enough
+        found, _ = self.spatial.nearest(x, y, max_radius=SELECT_RADIUS)
+        self.selected_cell = self.cells[found[0]] if len(found) else None
+
+    def center_on_selected(self):
+        if self.selected_cell is not None:
+            self.camera.center_on(self.selected_cell.x, self.selected_cell.y)
 
     def initialize(self):
         for _ in range(INITIAL_CELLS):
-            self.add_cell(random.uniform(0, self.width), random.uniform(0, self.height))
+            self.add_cell(self.rng.uniform(0, self.width), self.rng.uniform(0, self.height))
 
-        for _ in range(INITIAL_FOOD):
-            self.add_food(random.uniform(0, self.width), random.uniform(0, self.height))
+        self.initial_food()
+        self.index_cells()
 
     def next_generation(self):
         self.generation += 1
@@ -234,46 +243,44 @@ class Engine:
         self.simulated_time = 0
         self.selected_cell = None
 
-        # Combine living and recently dead cells
-        all_cells = self.cells + self.dead_cells
-        if all_cells:
-            all_cells.sort(key=lambda c: (c.lifetime, c.energy), reverse=True)
-            top_cells = all_cells[:max(INITIAL_CELLS // 10, 1)]
+        # Rank living and recently dead cells together, their brains as the rows of one array
+        if self.cells or len(self.tombstones):
+            genomes = np.concatenate([np.array([cell.brain.weights for cell in self.cells]).reshape(-1, GENOME_LENGTH),
+                                      self.tombstones.genome_block()])
+            if self.evaluator is not None:
+                order = evolution.rank(*self.evaluator.scores(genomes, self.rng))
+            else:
+                order = evolution.rank(self.population_values(lambda cell: cell.energy, self.tombstones.field("energy")),
+                                       self.population_values(lambda cell: cell.lifetime, self.tombstones.field("lifetime"), np.int64))
+            ranked = genomes[order]
         else:
-            top_cells = [Cell(random.randint(1, self.width - 2), random.randint(1, self.height - 2))]
-
-        new_cells = []
-        while len(new_cells) < INITIAL_CELLS - 2:  # Leave space for 2 random cells
-            parent = random.choice(top_cells)
-            child = parent.reproduce()
-            child.x = random.randint(1, self.width - 2)
-            child.y = random.randint(1, self.height - 2)
-            new_cells.append(child)
-
-        # Add 2 completely new random cells
-        for _ in range(2):
-            new_cell = Cell(random.randint(1, self.width - 2), random.randint(1, self.height - 2))
-            new_cells.append(new_cell)
-
-        # reset the brith time of each cell
+            ranked = self.rng.standard_normal((1, GENOME_LENGTH))
+        self.top_genomes = ranked[:evolution.parent_count()]
+
+        # All but 2 cells are children of the last generation, the rest are new random cells
+        n_children = max(INITIAL_CELLS - 2, 0)
+        genomes = np.concatenate([evolution.breed(ranked, n_children, self.rng),
+                                  self.rng.standard_normal((INITIAL_CELLS - n_children, GENOME_LENGTH))])
+        x = self.rng.integers(1, self.width - 1, INITIAL_CELLS)
+        y = self.rng.integers(1, self.height - 1, INITIAL_CELLS)
+        orientation = self.rng.random(INITIAL_CELLS) * 360
+        # Each brain is a view of its row, so the generation's genomes stay one block
+        weights = genomes.reshape(INITIAL_CELLS, len(INPUT_LABELS), len(OUTPUT_LABELS))
+        new_cells = [Cell(x[i], y[i], weights[i], orientation=orientation[i]) for i in range(INITIAL_CELLS)]
         for cell in new_cells:
             cell.birth_time = self.simulated_time
 
         self.cells = new_cells
-        self.dead_cells = []  # Clear the dead cells list
-        self.cell_positions = {(int(cell.x), int(cell.y)): cell for cell in self.cells}
+        self.tombstones.clear()
 
-        # Reset food
-        self.foods.clear()
-        self.food_positions.clear()
-        for _ in range(INITIAL_FOOD):
-            self.add_food(random.randint(1, self.width - 2), random.randint(1, self.height - 2))
+        self.scatter_food()
 
     def toggle_vision(self):
         self.show_vision = not self.show_vision
 
     def force_next_generation(self):
         self.next_generation()
+        self.index_cells()
 
     def toggle_pause(self):
         self.paused = not self.paused
@@ -287,20 +294,115 @@ class Engine:
         self.speed = SIMULATION_SPEEDS[(current_index - 1) % len(SIMULATION_SPEEDS)]
     
     def restart(self):
+        self.rng = np.random.default_rng(self.seed)
         self.generation = 1
         self.real_time = 0
         self.simulated_time = 0
         self.selected_cell = None
         self.cells.clear()
-        self.dead_cells.clear()
-        self.cell_positions.clear()
-        self.foods.clear()
-        self.food_positions.clear()
+        self.tombstones.clear()
+        self.food.clear()
         self.selected_cell = None
         self.log_file.close()
         self.log_file = self.create_log_file()
         self.initialize()
 
+    def get_state(self):
+        # Everything needed to resume the run, as plain arrays and numbers
+        state = {
+            "kind": "object",
+            "generation": self.generation,
+            "time": self.time,
+            "real_time": self.real_time,
+            "simulated_time": self.simulated_time,
+            "speed": self.speed,
+            "width": self.width,
+            "height": self.height,
+            "seed": json.dumps(self.seed),
+            "log_path": self.log_file.name if self.log_file is not None else "",
+            "rng_state": json.dumps(self.rng.bit_generator.state),
+            "food": self.food.positions(),
+            "food_patches": self.food.patches if self.food.patches is not None else np.empty((0, 2)),
+        }
+        for stat, value in self.stats.items():
+            state["stat_" + stat] = value
+        state.update(self.get_population_state())
+        return state
+
+    def set_state(self, state):
+        self.generation = int(state["generation"])
+        self.time = float(state["time"])
+        self.real_time = float(state["real_time"])
+        self.simulated_time = float(state["simulated_time"])
+        self.speed = state["speed"].item() if isinstance(state["speed"], np.ndarray) else state["speed"]
+        self.width = int(state["width"])
+        self.height = int(state["height"])
+        self.seed = json.loads(str(state["seed"]))
+        for stat in self.stats:
+            self.stats[stat] = float(state["stat_" + stat])
+        self.selected_cell = None
+        if "log_path" in state and os.path.exists(str(state["log_path"])):
+            # Carry on writing the run's own log instead of the empty one just opened
+            fresh = self.log_file
+            self.log_file = StatsLog(str(state["log_path"]), resume_generation=self.generation)
+            fresh.close()
+            os.remove(fresh.name)
+        self.set_population_state(state)
+        self.spatial = SpatialHash(self.width, self.height)
+        self.camera = self.create_camera()
+        self.index_cells()
+        tracking = self.food.track_changes
+        self.food = FoodField(self.width, self.height)
+        self.food.track_changes = tracking
+        food = state["food"].reshape(-1, 2)
+        if "food_visible" in state:
+            # Older checkpoints list every Food object, including ones hidden under another
+            food = food[state["food_visible"]]
+        self.food.add(*food.T)
+        if "food_patches" in state and state["food_patches"].size:
+            self.food.place_patches(self.rng, state["food_patches"])
+        # Last, since rebuilding the cells above draws from the generator
+        self.rng = np.random.default_rng()
+        self.rng.bit_generator.state = json.loads(str(state["rng_state"]))
+
+    def get_population_state(self):
+        # Living cells first, then the tombstones
+        dead = self.tombstones
+        state = {name: self.population_values(lambda cell: getattr(cell, name), dead.field(name), dtype)
+                 for name, dtype in [("x", float), ("y", float), ("orientation", float), ("energy", float),
+                                     ("lifetime", np.int64), ("food_eaten", np.int64), ("distance_traveled", float),
+                                     ("birth_time", float)]}
+        state.update({
+            "death_time": np.concatenate([np.full(len(self.cells), np.nan), dead.field("death_time")]),
+            "alive": np.arange(len(self.cells) + len(dead)) < len(self.cells),
+            "weights": np.concatenate([np.array([cell.brain.weights for cell in self.cells]).reshape(-1, GENOME_LENGTH),
+                                       dead.genome_block()]).reshape(-1, len(INPUT_LABELS), len(OUTPUT_LABELS)),
+            "top_genomes": self.top_genomes,
+        })
+        return state
+
+    def set_population_state(self, state):
+        self.cells = []
+        weights = np.array(state["weights"], dtype=float)
+        alive = np.asarray(state["alive"], dtype=bool)
+        for i in np.flatnonzero(alive).tolist():
+            # Kept as NumPy scalars, like a running cell's values, so the
+            # arithmetic rounds exactly the same after resuming
+            cell = Cell(state["x"][i], state["y"][i], weights[i], self.rng)
+            cell.orientation = state["orientation"][i]
+            cell.energy = state["energy"][i]
+            cell.lifetime = int(state["lifetime"][i])
+            cell.food_eaten = int(state["food_eaten"][i])
+            cell.distance_traveled = state["distance_traveled"][i]
+            cell.birth_time = float(state["birth_time"][i])
+            self.cells.append(cell)
+        self.tombstones.load({name: state[name][~alive] for name in RECORD_DTYPE.names},
+                             weights[~alive].reshape(-1, GENOME_LENGTH))
+        if "top_genomes" in state:
+            self.top_genomes = np.array(state["top_genomes"], dtype=float)
+
     def __del__(self):
-        if hasattr(self, 'log_file'):
+        if getattr(self, 'log_file', None) is not None:
             self.log_file.close()
+        if getattr(self, 'evaluator', None) is not None:
+            self.evaluator.close()
@@ -0,0 +1,107 @@
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from config import *
+from array_engine import ArrayEngine
+from brains import BrainPool
+from cell import INPUT_LABELS, OUTPUT_LABELS
+
+# Fitness over several episodes instead of the one generation on screen. An
+# episode puts the whole population into a fresh world with its own starting
+# places and food, for one generation. Episodes run on a process pool that
+# reads the genomes from one shared memory block and writes the scores into
+# another, so nothing but a few names and numbers is pickled.
+
+class EpisodeEngine(ArrayEngine):
+    # Plays one generation of the given genomes and stops; keeps no log
+    def __init__(self, seed, hidden_layers, dtype):
+        super().__init__(seed)
+        self.brains = BrainPool(len(INPUT_LABELS), len(OUTPUT_LABELS), hidden_layers, dtype)
+
+    def create_log_file(self):
+        return None
+
+    def create_evaluator(self):
+        return None
+
+    def __del__(self):
+        pass
+
+    def play(self, genomes):
+        n = len(genomes)
+        self.spawn(self.rng.integers(1, self.width - 1, n).astype(float),
+                   self.rng.integers(1, self.height - 1, n).astype(float), genomes)
+        self.initial_food()
+        # The ticks of update(), up to where it would end the generation
+        while True:
+            self.simulated_time += 1 / FPS
+            self.step_cells(1)
+            if self.generation_over():
+                return self.energy, self.lifetime
+
+def run_episode(task):
+    genome_name, shape, dtype, hidden_layers, score_name, episodes, episode, seed = task
+    genome_memory = shared_memory.SharedMemory(genome_name)
+    score_memory = shared_memory.SharedMemory(score_name)
+    try:
+        genomes = np.ndarray(shape, dtype, genome_memory.buf).copy()
+        scores = np.ndarray((episodes, 2, shape[0]), np.float64, score_memory.buf)
+        scores[episode] = EpisodeEngine(seed, hidden_layers, dtype).play(genomes)
+        del scores
+    finally:
+        genome_memory.close()
+        score_memory.close()
+
+class Evaluator:
+    # Scores populations over `episodes` episodes on `workers` processes (all
+    # cores by default). Each episode has its own seed drawn from the engine's
+    # generator, so the scores don't depend on how many workers there are.
+    def __init__(self, episodes=None, workers=None):
+        self.episodes = EVALUATION_EPISODES if episodes is None else episodes
+        self.workers = EVALUATION_WORKERS if workers is None else workers
+        self.pool = None
+        self.genome_memory = None
+        self.score_memory = None
+
+    def share(self, memory, nbytes):
+        # A shared block of at least nbytes, reused from generation to generation
+        if memory is None or memory.size < nbytes:
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+            memory = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        return memory
+
+    def scores(self, genomes, rng, hidden_layers=()):
+        # Mean final energy and lifetime of each genome over the episodes, the
+        # keys next_generation ranks by
+        seeds = rng.integers(0, 1 << 63, self.episodes)
+        self.genome_memory = self.share(self.genome_memory, genomes.nbytes)
+        self.score_memory = self.share(self.score_memory, self.episodes * 2 * len(genomes) * 8)
+        shared = np.ndarray(genomes.shape, genomes.dtype, self.genome_memory.buf)
+        shared[:] = genomes
+        del shared
+        tasks = [(self.genome_memory.name, genomes.shape, genomes.dtype.str, list(hidden_layers),
+                  self.score_memory.name, self.episodes, episode, int(seed)) for episode, seed in enumerate(seeds)]
+        # Worker processes can't have children of their own, e.g. under islands.py
+        if self.workers == 1 or mp.current_process().daemon:
+            for task in tasks:
+                run_episode(task)
+        else:
+            if self.pool is None:
+                self.pool = mp.Pool(self.workers)
+            self.pool.map(run_episode, tasks)
+        scores = np.ndarray((self.episodes, 2, len(genomes)), np.float64, self.score_memory.buf)
+        energy, lifetime = scores.mean(axis=0)
+        del scores
+        return energy, lifetime
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+        for memory in (self.genome_memory, self.score_memory):
+            if memory is not None:
+                memory.close()
+                memory.unlink()
+        self.genome_memory = self.score_memory = None
@@ -0,0 +1,51 @@
+import numpy as np
+from config import *
+
+# Generation turnover on a whole population at once. Genomes are the rows of
+# one (N, genome_length) array, ranked best first, and every step below is a
+# handful of array operations however large N is.
+SELECTION_METHODS = ["truncation", "tournament", "rank"]
+
+def rank(*keys):
+    # Order of the population, best first. The last key sorts first, like np.lexsort.
+    return np.lexsort(keys)[::-1]
+
+def parent_count():
+    # How many of the best take part in truncation selection
+    return max(int(INITIAL_CELLS * TRUNCATION_FRACTION), 1)
+
+def select(population, n, rng, method=None):
+    # Rows of a ranked population of the given size to breed n children from
+    if method is None:
+        method = SELECTION
+    if method == "truncation":
+        return rng.integers(0, min(parent_count(), population), n)
+    if method == "tournament":
+        # The best of TOURNAMENT_SIZE random rows, which is the lowest row number
+        return rng.integers(0, population, (n, TOURNAMENT_SIZE)).min(axis=1)
+    if method == "rank":
+        # Chance falls linearly with rank, from population down to 1
+        weights = np.arange(population, 0, -1, dtype=float)
+        return rng.choice(population, n, p=weights / weights.sum())
+    raise ValueError(f"Unknown selection method: {method}")
+
+def crossover(first, second, rng):
+    # Uniform crossover for a CROSSOVER_RATE share of the children: each gene
+    # comes from either parent with equal chance
+    crossed = rng.random(len(first)) < CROSSOVER_RATE
+    genes = rng.random(first.shape) < 0.5
+    return np.where(crossed[:, None] & genes, second, first)
+
+def mutate(genomes, rng):
+    # Each gene changes with chance MUTATION_RATE by a normal step of MUTATION_AMOUNT
+    t = rng.uniform(-0.5, 0.5, genomes.shape)
+    mask = np.abs(t) < MUTATION_RATE / 2
+    genomes[mask] += rng.normal(0, MUTATION_AMOUNT, mask.sum()).astype(genomes.dtype)
+    return genomes
+
+def breed(ranked, n, rng):
+    # n children of the ranked genomes, as a new array
+    children = ranked[select(len(ranked), n, rng)]
+    if CROSSOVER_RATE > 0:
+        children = crossover(children, ranked[select(len(ranked), n, rng)], rng)
+    return mutate(children, rng)
@@ -1,11 +1,117 @@
-import pygame
-from config import GREEN, CELL_SIZE, FOOD_ENERGY
+import numpy as np
+from config import (FOOD_REGROWTH, FOOD_REGROWTH_RATE, FOOD_PATCHES, FOOD_PATCH_RADIUS,
+                    FOOD_SEASON_LENGTH)
 
-class Food:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.energy = FOOD_ENERGY
+REGROWTH_MODES = ["none", "rate", "patchy", "seasonal"]
 
-    def draw(self, screen):
-        pygame.draw.rect(screen, GREEN, (self.x * CELL_SIZE, self.y * CELL_SIZE, CELL_SIZE, CELL_SIZE))
+class FoodField:
+    # All food in the world as a (width, height) boolean grid, at most one item
+    # per square. Food is added, eaten and regrown in whole arrays at a time.
+    def __init__(self, width, height, regrowth=None):
+        self.regrowth = FOOD_REGROWTH if regrowth is None else regrowth
+        if self.regrowth not in REGROWTH_MODES:
+            raise ValueError(f"Unknown food regrowth mode: {self.regrowth}")
+        self.width = width
+        self.height = height
+        self.grid = np.zeros((width, height), dtype=bool)
+        self.total = 0
+        self.patches = None  # Centers of the fertile spots for "patchy"
+        # Squares that changed since the renderer last looked, only recorded
+        # once a renderer is attached; reset means everything changed
+        self.track_changes = False
+        self.changes = []
+        self.reset = True
+
+    def count(self):
+        return self.total
+
+    def positions(self):
+        return np.argwhere(self.grid)
+
+    def squares(self, x, y):
+        return (np.atleast_1d(np.asarray(x, dtype=np.int64)) % self.width,
+                np.atleast_1d(np.asarray(y, dtype=np.int64)) % self.height)
+
+    def add(self, x, y):
+        x, y = self.squares(x, y)
+        new = ~self.grid[x, y]
+        if new.any():
+            x, y = x[new], y[new]
+            self.grid[x, y] = True
+            # The same square can come up twice in one batch
+            self.total += len(x) if len(x) == 1 else len(np.unique(x * self.height + y))
+            if self.track_changes:
+                self.changes.append((x, y))
+
+    def remove(self, x, y):
+        # The squares must hold food
+        x, y = self.squares(x, y)
+        if len(x):
+            self.grid[x, y] = False
+            self.total -= len(x)
+            if self.track_changes:
+                self.changes.append((x, y))
+
+    def clear(self):
+        self.grid[:] = False
+        self.total = 0
+        self.changes.clear()
+        self.reset = True
+
+    def consume(self, x, y):
+        # x, y are the squares of the cells that may eat, in priority order.
+        # Returns which of them eat: when several share a food square, the
+        # first one gets it.
+        on_food = self.grid[x, y]
+        candidates = np.flatnonzero(on_food)
+        _, first = np.unique(x[candidates] * self.height + y[candidates], return_index=True)
+        eaters = np.zeros(len(x), dtype=bool)
+        eaters[candidates[first]] = True
+        self.remove(x[eaters], y[eaters])
+        return eaters
+
+    def place_patches(self, rng, centers=None):
+        # Fertile spots for "patchy" regrowth, a Gaussian around each, wrapping
+        # at the edges. Kept as one profile per axis, so a large world never
+        # needs a fertility value for every square.
+        if centers is None:
+            centers = rng.uniform(0, [self.width, self.height], size=(FOOD_PATCHES, 2))
+        self.patches = np.asarray(centers, dtype=float).reshape(-1, 2)
+        dx = np.abs(np.arange(self.width)[:, None] - self.patches[:, 0])  # (width, patches)
+        dy = np.abs(np.arange(self.height)[:, None] - self.patches[:, 1])  # (height, patches)
+        dx = np.minimum(dx, self.width - dx)
+        dy = np.minimum(dy, self.height - dy)
+        self.patch_x = np.exp(-dx**2 / (2 * FOOD_PATCH_RADIUS**2))
+        self.patch_y = np.exp(-dy**2 / (2 * FOOD_PATCH_RADIUS**2))
+        self.patch_mean = self.patch_x.sum(axis=0) @ self.patch_y.sum(axis=0) / (self.width * self.height)
+
+    def fertility(self, x, y):
+        # Relative regrowth chance of the given squares, 1 on average over the world
+        return np.einsum("np,np->n", self.patch_x[x], self.patch_y[y]) / self.patch_mean
+
+    def regrow(self, dt, time, rng):
+        # Every empty square grows food with chance FOOD_REGROWTH_RATE per
+        # second, shaped by the regrowth mode. Rather than a random number per
+        # square, the number of squares that try is drawn first, so the cost
+        # follows the growth and not the size of the world.
+        if self.regrowth == "none":
+            return
+        chance = FOOD_REGROWTH_RATE * dt
+        if self.regrowth == "seasonal":
+            chance *= 1 + np.sin(2 * np.pi * time / FOOD_SEASON_LENGTH)
+        bound = chance
+        if self.regrowth == "patchy":
+            if self.patches is None:
+                self.place_patches(rng)
+            # No square is more fertile than every patch's peak together
+            bound = chance * len(self.patches) / self.patch_mean
+        n = rng.binomial(self.width * self.height, min(bound, 1))
+        if n == 0:
+            return
+        x = rng.integers(0, self.width, n)
+        y = rng.integers(0, self.height, n)
+        if self.regrowth == "patchy":
+            keep = rng.random(n) * bound < chance * self.fertility(x, y)
+            x, y = x[keep], y[keep]
+        # Squares that already hold food stay as they are
+        self.add(x, y)
@@ -0,0 +1,100 @@
+import argparse
+import hashlib
+import json
+import sys
+import numpy as np
+import config
+from headless import create_engine
+
+# The parts of the state that make up a trajectory. Food is sorted because the
+# object engine keeps it in a set with no fixed order.
+HASHED_FIELDS = ["x", "y", "orientation", "energy", "alive", "lifetime", "food_eaten"]
+STAT_KEYS = ["avg_lifespan", "avg_food_eaten", "avg_distance", "remaining_food"]
+
+def state_hash(engine):
+    state = engine.get_state()
+    h = hashlib.sha256()
+    for name in HASHED_FIELDS:
+        h.update(np.ascontiguousarray(state[name]).tobytes())
+    h.update(np.ascontiguousarray(state["genomes"] if "genomes" in state else state["weights"]).tobytes())
+    food = state["food"]
+    h.update(np.ascontiguousarray(food[np.lexsort(food.T[::-1])]).tobytes())
+    return h.hexdigest()
+
+def config_settings():
+    return {name: getattr(config, name) for name in dir(config)
+            if name.isupper() and isinstance(getattr(config, name), (int, float, str, bool, list, type(None)))}
+
+def record_trajectory(kind, seed, generations):
+    engine = create_engine(kind, seed)
+    hashes = []
+    stats = []
+    start_generation = engine.generation
+    while engine.generation - start_generation < generations:
+        generation = engine.generation
+        engine.update()
+        hashes.append(state_hash(engine))
+        if engine.generation != generation:
+            stats.append([generation] + [engine.stats[key] for key in STAT_KEYS])
+    engine.log_file.close()
+    return np.array(hashes), np.array(stats, dtype=float)
+
+def record(path, kind, seed, generations):
+    hashes, stats = record_trajectory(kind, seed, generations)
+    np.savez(path, hashes=hashes, stats=stats, kind=kind, seed=seed, generations=generations,
+             config=json.dumps(config_settings()))
+    print(f"Recorded {len(hashes)} ticks over {generations} generations to {path}")
+
+def check(path):
+    with np.load(path) as golden:
+        kind = str(golden["kind"])
+        seed = int(golden["seed"])
+        generations = int(golden["generations"])
+        golden_hashes = golden["hashes"]
+        golden_stats = golden["stats"]
+        golden_config = json.loads(str(golden["config"]))
+
+    changed = {name: (value, golden_config[name]) for name, value in config_settings().items()
+               if name in golden_config and golden_config[name] != value}
+    for name, (value, expected) in changed.items():
+        print(f"Warning: {name} is {value!r}, the golden run used {expected!r}")
+
+    hashes, stats = record_trajectory(kind, seed, generations)
+    ok = True
+    mismatch = next((i for i, (a, b) in enumerate(zip(hashes, golden_hashes)) if a != b), None)
+    if mismatch is not None:
+        print(f"State differs from tick {mismatch + 1} on")
+        ok = False
+    elif len(hashes) != len(golden_hashes):
+        print(f"Run took {len(hashes)} ticks, the golden run took {len(golden_hashes)}")
+        ok = False
+
+    for row, golden_row in zip(stats, golden_stats):
+        if not np.array_equal(row, golden_row):
+            print(f"Generation {row[0]:.0f} stats differ: " +
+                  ", ".join(f"{key} {value} != {expected}" for key, value, expected
+                            in zip(STAT_KEYS, row[1:], golden_row[1:]) if value != expected))
+            ok = False
+
+    print("Trajectory matches the golden run" if ok else "Trajectory does NOT match the golden run")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a seeded run, or check that a build still reproduces it.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record", help="record a golden trajectory")
+    record_parser.add_argument("path")
+    record_parser.add_argument("--engine", choices=["array", "object"], default="array")
+    record_parser.add_argument("--seed", type=int, default=0)
+    record_parser.add_argument("--generations", type=int, default=3)
+    check_parser = subparsers.add_parser("check", help="compare this build against a golden trajectory")
+    check_parser.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.path, args.engine, args.seed, args.generations)
+    elif not check(args.path):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
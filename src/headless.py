@@ -0,0 +1,133 @@
+import argparse
+import time
+from config import *
+from engine import Engine
+from array_engine import ArrayEngine
+import checkpoint
+from telemetry import TelemetryServer
+from evaluation import Evaluator
+
+def tick_length(text):
+    speed = float(text)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError(f"{text} is not a positive tick length")
+    return speed
+
+def create_engine(kind="array", seed=None):
+    engine = ArrayEngine(seed) if kind == "array" else Engine(seed)
+    engine.initialize()
+    return engine
+
+def run(engine, generations=None, seconds=None, on_generation=None, on_tick=None):
+    # Step the engine as fast as possible, with no rendering and no frame cap,
+    # until `generations` generations have finished or `seconds` have passed.
+    start = time.perf_counter()
+    start_generation = engine.generation
+    ticks = 0
+
+    while True:
+        generation = engine.generation
+        engine.update()
+        ticks += 1
+        if on_tick is not None:
+            on_tick(engine)
+
+        if engine.generation != generation:
+            if on_generation is not None:
+                on_generation(engine, generation)
+            if generations is not None and engine.generation - start_generation >= generations:
+                break
+        if seconds is not None and time.perf_counter() - start >= seconds:
+            break
+
+    return ticks, time.perf_counter() - start
+
+def print_generation(engine, generation):
+    stats = engine.stats
+    print(f"Generation {generation}: "
+          f"Avg Lifespan: {stats['avg_lifespan']:.2f}, "
+          f"Avg Food Eaten: {stats['avg_food_eaten']:.2f}, "
+          f"Avg Distance: {stats['avg_distance']:.2f}, "
+          f"Remaining Food: {stats['remaining_food']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the evolution simulation without a window.")
+    parser.add_argument("--generations", type=int, help="number of generations to run")
+    parser.add_argument("--seconds", type=float, help="wall-clock budget in seconds")
+    parser.add_argument("--engine", choices=["array", "object"], default="array")
+    parser.add_argument("--speed", type=tick_length, default=1,
+                        help="length of each tick in plain ticks; longer ticks decide once and sweep the path")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="profile every phase and append one JSON line per generation to PATH")
+    parser.add_argument("--seed", type=int, default=SEED, help="seed for a reproducible run")
+    parser.add_argument("--quiet", action="store_true", help="don't print per-generation stats")
+    parser.add_argument("--resume", metavar="PATH", help="checkpoint to continue from, or 'latest'")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_INTERVAL, metavar="N",
+                        help="save a checkpoint every N generations (0 disables)")
+    parser.add_argument("--episodes", type=int, default=EVALUATION_EPISODES, metavar="N",
+                        help="rank each generation by N episodes with fresh food, run in parallel (0: by the generation itself)")
+    parser.add_argument("--workers", type=int, default=EVALUATION_WORKERS,
+                        help="processes for the episodes (default: all cores)")
+    parser.add_argument("--serve", type=int, nargs="?", const=TELEMETRY_PORT, metavar="PORT",
+                        help=f"stream the run to viewers (python src/viewer.py) on PORT (default {TELEMETRY_PORT})")
+    args = parser.parse_args()
+    if args.generations is None and args.seconds is None:
+        parser.error("give --generations and/or --seconds")
+
+    if args.resume:
+        path = checkpoint.latest_checkpoint() if args.resume == "latest" else args.resume
+        if path is None:
+            parser.error("no checkpoint found to resume from")
+        engine = checkpoint.load(path)
+        print(f"Resumed from {path} at generation {engine.generation}")
+    else:
+        engine = create_engine(args.engine, args.seed)
+        engine.speed = args.speed
+    if args.episodes != EVALUATION_EPISODES or args.workers != EVALUATION_WORKERS:
+        if engine.evaluator is not None:
+            engine.evaluator.close()
+        engine.evaluator = Evaluator(args.episodes, args.workers) if args.episodes > 0 else None
+
+    checkpointer = checkpoint.Checkpointer(interval=args.checkpoint_every)
+    metrics_file = None
+    if args.metrics:
+        metrics_file = open(args.metrics, "a")
+        engine.profiler.enabled = True
+        engine.profiler.reset()
+
+    server = None
+    if args.serve is not None:
+        server = TelemetryServer(engine, port=args.serve)
+        print(f"Streaming to viewers on {TELEMETRY_HOST}:{server.port}")
+
+    def on_generation(engine, generation):
+        if server is not None:
+            server.publish_stats(engine, generation)
+        if not args.quiet:
+            print_generation(engine, generation)
+        if metrics_file is not None:
+            engine.profiler.write_metrics(metrics_file, generation=generation, cells=engine.cell_count())
+        checkpointer.on_generation(engine)
+
+    try:
+        ticks, elapsed = run(engine, args.generations, args.seconds, on_generation,
+                             server.publish if server is not None else None)
+    finally:
+        if server is not None:
+            server.close()
+            print(f"Sent {server.frames_sent} frames to viewers, dropped {server.frames_dropped}")
+        if args.checkpoint_every > 0:
+            checkpointer.save(engine)
+        checkpointer.close()
+        engine.log_file.close()
+        if engine.evaluator is not None:
+            engine.evaluator.close()
+        if metrics_file is not None:
+            metrics_file.close()
+    length = f" of length {engine.speed:g} ({ticks * engine.speed:.0f} plain ticks of time)" if engine.speed != 1 else ""
+    print(f"{ticks} ticks{length} in {elapsed:.2f}s ({ticks / elapsed:.0f} ticks/s), "
+          f"reached generation {engine.generation}")
+    print(f"Log written to {engine.log_file.name}")
+
+if __name__ == "__main__":
+    main()
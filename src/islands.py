@@ -0,0 +1,127 @@
+import argparse
+import multiprocessing as mp
+import numpy as np
+from config import *
+from engine import log_path
+from array_engine import ArrayEngine
+from headless import run
+from stats_log import StatsLog, generation_row, COLUMNS
+
+VALUE_KEYS = ["lifespan", "food_eaten", "distance", "fitness"]
+
+class IslandEngine(ArrayEngine):
+    # Hands each generation's values to the parent, which logs all islands
+    # together, instead of writing a log of its own
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.history = []
+
+    def create_log_file(self):
+        return None
+
+    def log_stats(self):
+        values = self.generation_values()
+        self.history.append((dict(self.stats, generation=self.generation),
+                             dict({key: np.array(values[key], dtype=float) for key in VALUE_KEYS},
+                                  survivors=values["survivors"])))
+
+def island_worker(conn, seed):
+    engine = IslandEngine(seed)
+    engine.initialize()
+
+    while True:
+        command, arg = conn.recv()
+        if command == "run":
+            engine.history = []
+            run(engine, generations=arg)
+            conn.send((engine.history, engine.top_genomes[:MIGRANTS].copy()))
+        elif command == "immigrate":
+            engine.immigrate(arg)
+            conn.send(None)
+        elif command == "stop":
+            break
+    conn.close()
+
+def migration_targets(source, n_islands, topology):
+    if topology == "ring":
+        return [(source + 1) % n_islands] if n_islands > 1 else []
+    if topology == "full":
+        return [i for i in range(n_islands) if i != source]
+    raise ValueError(f"Unknown migration topology: {topology}")
+
+def log_generation(log, generation, island_history):
+    # A row for all islands together (island -1), with the averages and
+    # percentiles over every individual of every island and the mean
+    # remaining food per island, then one row per island
+    island_stats = [stats for stats, _ in island_history]
+    values = {key: np.concatenate([island_values[key] for _, island_values in island_history]) for key in VALUE_KEYS}
+    values["survivors"] = sum(island_values["survivors"] for _, island_values in island_history)
+    mean = {f"avg_{key}": float(values[key].mean()) if len(values[key]) else 0 for key in ["lifespan", "food_eaten", "distance"]}
+    mean["remaining_food"] = np.mean([stats["remaining_food"] for stats in island_stats])
+    log.append([-1] + generation_row(generation, mean, values))
+    for i, (stats, island_values) in enumerate(island_history):
+        log.append([i] + generation_row(generation, stats, island_values))
+    return mean
+
+def run_islands(generations, n_islands=ISLANDS, interval=MIGRATION_INTERVAL, topology=MIGRATION_TOPOLOGY,
+                seed=None, verbose=True):
+    migration_targets(0, n_islands, topology)  # Fail early on a bad topology
+    log = StatsLog(log_path("islands", "stats"), columns=["island"] + COLUMNS)
+    # One independent seed per island, all derived from the run's seed
+    seeds = np.random.SeedSequence(SEED if seed is None else seed).generate_state(n_islands)
+    pipes = []
+    processes = []
+    for island_seed in seeds:
+        parent_conn, child_conn = mp.Pipe()
+        process = mp.Process(target=island_worker, args=(child_conn, int(island_seed)), daemon=True)
+        process.start()
+        pipes.append(parent_conn)
+        processes.append(process)
+
+    try:
+        done = 0
+        while done < generations:
+            epoch = min(interval, generations - done)
+            for conn in pipes:
+                conn.send(("run", epoch))
+            results = [conn.recv() for conn in pipes]
+
+            for k in range(epoch):
+                island_history = [history[k] for history, _ in results]
+                generation = island_history[0][0]["generation"]
+                mean = log_generation(log, generation, island_history)
+                if verbose:
+                    per_island = ", ".join(f"{stats['avg_food_eaten']:.2f}" for stats, _ in island_history)
+                    print(f"Generation {generation}: Avg Food Eaten: {mean['avg_food_eaten']:.2f} (islands: {per_island})")
+            done += epoch
+
+            if done < generations:
+                incoming = [[] for _ in range(n_islands)]
+                for source, (_, emigrants) in enumerate(results):
+                    for target in migration_targets(source, n_islands, topology):
+                        incoming[target].append(emigrants)
+                for conn, genomes in zip(pipes, incoming):
+                    conn.send(("immigrate", np.concatenate(genomes) if genomes else emigrants[:0]))
+                for conn in pipes:
+                    conn.recv()
+    finally:
+        for conn in pipes:
+            conn.send(("stop", None))
+        for process in processes:
+            process.join()
+        log.close()
+    return log.name
+
+def main():
+    parser = argparse.ArgumentParser(description="Evolve several populations in parallel with periodic migration.")
+    parser.add_argument("--generations", type=int, required=True)
+    parser.add_argument("--islands", type=int, default=ISLANDS)
+    parser.add_argument("--interval", type=int, default=MIGRATION_INTERVAL, help="generations between migrations")
+    parser.add_argument("--topology", choices=["ring", "full"], default=MIGRATION_TOPOLOGY)
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+    log_name = run_islands(args.generations, args.islands, args.interval, args.topology, args.seed)
+    print(f"Log written to {log_name}")
+
+if __name__ == "__main__":
+    main()
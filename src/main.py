@@ -1,15 +1,33 @@
+import argparse
+import time
 import pygame
 from config import *
 from engine import Engine
+from array_engine import ArrayEngine
+from worker import SimulationWorker, SimulationView
+import checkpoint
 
 def main():
+    parser = argparse.ArgumentParser(description="Evolution Simulation")
+    parser.add_argument("--resume", metavar="PATH", help="checkpoint to continue from, or 'latest'")
+    args = parser.parse_args()
+
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Evolution Simulation")
     clock = pygame.time.Clock()
 
-    engine = Engine()
-    engine.initialize()
+    resume_path = checkpoint.latest_checkpoint() if args.resume == "latest" else args.resume
+    if resume_path:
+        engine = checkpoint.load(resume_path)
+    else:
+        engine = ArrayEngine() if USE_ARRAY_ENGINE else Engine()
+        engine.initialize()
+    checkpointer = checkpoint.Checkpointer()
+    # The simulation runs on its own thread; this loop only draws its latest
+    # snapshot and sends it what the user does
+    worker = SimulationWorker(engine, checkpointer)
+    view = SimulationView(worker)
 
     font = pygame.font.Font(None, 32)
     button_width = 120
@@ -20,60 +38,116 @@ def main():
     next_gen_button = pygame.Rect(270, button_y, button_width, button_height)
     speed_button = pygame.Rect(400, button_y, button_width, button_height)
     pause_button = pygame.Rect(530, button_y, button_width, button_height)
+    turbo_button = pygame.Rect(660, button_y, button_width, button_height)
+    button_area = pygame.Rect(0, HEIGHT - BUTTON_AREA_HEIGHT, WIDTH - INFO_PANEL_WIDTH, BUTTON_AREA_HEIGHT)
+    restart_text = font.render("Restart", True, WHITE)
+    vision_text = font.render("Vision", True, WHITE)
+    next_gen_text = font.render("Next Gen", True, WHITE)
+    turbo_text = font.render("Turbo", True, WHITE)
+    last_button_state = None
+    dragging = False
 
     running = True
     while running:
+        frame_start = time.perf_counter()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED) and view.renderer is not None:
+                view.renderer.invalidate()
             if event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Left click
                     if restart_button.collidepoint(event.pos):
-                        engine.restart()
+                        worker.send("restart")
                     elif vision_button.collidepoint(event.pos):
-                        engine.toggle_vision()
+                        view.toggle_vision()
                     elif next_gen_button.collidepoint(event.pos):
-                        engine.force_next_generation()
+                        worker.send("force_next_generation")
                     elif speed_button.collidepoint(event.pos):
-                        engine.increase_speed()
+                        worker.send("increase_speed")
                     elif pause_button.collidepoint(event.pos):
-                        engine.toggle_pause()
+                        worker.send("toggle_pause")
+                    elif turbo_button.collidepoint(event.pos):
+                        worker.send("toggle_turbo")
                     else:
-                        engine.select_cell(event.pos)
+                        view.select_cell(event.pos)
                 elif event.button == 3:  # Right click
                     if speed_button.collidepoint(event.pos):
-                        engine.decrease_speed()
+                        worker.send("decrease_speed")
+                    else:
+                        dragging = True
+                elif event.button == 2:  # Middle click
+                    dragging = True
+            if event.type == pygame.MOUSEBUTTONUP and event.button in (2, 3):
+                dragging = False
+            if event.type == pygame.MOUSEMOTION and dragging:
+                # Drag the world along with the mouse
+                view.camera.pan(-event.rel[0], -event.rel[1])
+            if event.type == pygame.MOUSEWHEEL:
+                # Zoom around the point under the mouse
+                x, y = pygame.mouse.get_pos()
+                view.camera.zoom(CAMERA_ZOOM_STEP ** event.y, x, y - LABEL_HEIGHT)
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
-                    engine.toggle_pause()
+                    worker.send("toggle_pause")
+                elif event.key == pygame.K_t:
+                    worker.send("toggle_turbo")
+                elif event.key == pygame.K_p:
+                    view.toggle_profiler()
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN):
+                    dx = (event.key == pygame.K_RIGHT) - (event.key == pygame.K_LEFT)
+                    dy = (event.key == pygame.K_DOWN) - (event.key == pygame.K_UP)
+                    view.camera.pan(dx * CAMERA_PAN_STEP * view.camera.view_width,
+                                    dy * CAMERA_PAN_STEP * view.camera.view_height)
+                elif event.key == pygame.K_HOME:
+                    view.camera.reset()
+                elif event.key == pygame.K_f:
+                    view.center_on_selected()
+
+        view.update()
+        dirty = view.draw(screen)
 
-        engine.update()
-        engine.draw(screen)
+        # Buttons only need drawing again when their labels change
+        button_state = (view.speed, view.paused, view.turbo)
+        if dirty is None or button_state != last_button_state:
+            last_button_state = button_state
+            pygame.draw.rect(screen, GREY, restart_button)
+            screen.blit(restart_text, (restart_button.x + 5, restart_button.y + 5))
 
-        # Draw buttons
-        pygame.draw.rect(screen, GREY, restart_button)
-        restart_text = font.render("Restart", True, WHITE)
-        screen.blit(restart_text, (restart_button.x + 5, restart_button.y + 5))
+            pygame.draw.rect(screen, GREY, vision_button)
+            screen.blit(vision_text, (vision_button.x + 5, vision_button.y + 5))
 
-        pygame.draw.rect(screen, GREY, vision_button)
-        vision_text = font.render("Vision", True, WHITE)
-        screen.blit(vision_text, (vision_button.x + 5, vision_button.y + 5))
+            pygame.draw.rect(screen, GREY, next_gen_button)
+            screen.blit(next_gen_text, (next_gen_button.x + 5, next_gen_button.y + 5))
 
-        pygame.draw.rect(screen, GREY, next_gen_button)
-        next_gen_text = font.render("Next Gen", True, WHITE)
-        screen.blit(next_gen_text, (next_gen_button.x + 5, next_gen_button.y + 5))
+            pygame.draw.rect(screen, GREY, speed_button)
+            speed_text = font.render(f"{view.speed}x", True, WHITE)
+            screen.blit(speed_text, (speed_button.x + 5, speed_button.y + 5))
 
-        pygame.draw.rect(screen, GREY, speed_button)
-        speed_text = font.render(f"{engine.speed}x", True, WHITE)
-        screen.blit(speed_text, (speed_button.x + 5, speed_button.y + 5))
+            pygame.draw.rect(screen, GREY, pause_button)
+            pause_text = font.render("Resume" if view.paused else "Pause", True, WHITE)
+            screen.blit(pause_text, (pause_button.x + 5, pause_button.y + 5))
 
-        pygame.draw.rect(screen, GREY, pause_button)
-        pause_text = font.render("Resume" if engine.paused else "Pause", True, WHITE)
-        screen.blit(pause_text, (pause_button.x + 5, pause_button.y + 5))
+            pygame.draw.rect(screen, DARK_BLUE if view.turbo else GREY, turbo_button)
+            screen.blit(turbo_text, (turbo_button.x + 5, turbo_button.y + 5))
+            if dirty is not None:
+                dirty.append(button_area)
 
-        pygame.display.flip()
+        if dirty is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+        view.profiler.add("frame", time.perf_counter() - frame_start)
+        view.profiler.count("frames")
+        view.tick_window()
         clock.tick(FPS)
 
+    # Keep the progress when the window is closed
+    worker.stop()
+    if CHECKPOINT_INTERVAL > 0:
+        checkpointer.save(engine)
+    checkpointer.close()
+    engine.log_file.close()
     pygame.quit()
 
 if __name__ == "__main__":
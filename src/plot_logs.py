@@ -1,91 +1,229 @@
+import argparse
+import glob
+import io
 import os
-import re
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 import tkinter as tk
 from tkinter import filedialog
+import stats_log
 
-def parse_log_file(file_path):
-    generations = []
-    lifespans = []
-    food_eaten = []
-    distances = []
-    remaining_food = []
-
-    with open(file_path, 'r') as file:
-        for line in file:
-            match = re.match(r'Generation (\d+): Avg Lifespan: ([\d.]+), Avg Food Eaten: ([\d.]+), Avg Distance: ([\d.]+), Remaining Food: (\d+)', line)
-            if match:
-                gen, lifespan, food, distance, remain = map(float, match.groups())
-                generations.append(gen)
-                lifespans.append(lifespan)
-                food_eaten.append(food)
-                distances.append(distance)
-                remaining_food.append(remain)
-
-    return generations, lifespans, food_eaten, distances, remaining_food
-
-def plot_data(generations, lifespans, food_eaten, distances, remaining_food):
-    fig, (ax1, ax2, ax3, ax4) = plt.subplots(4, 1, figsize=(10, 8), sharex=True)
-    
-    line1, = ax1.plot(generations, lifespans, 'b-')
-    ax1.set_ylabel('Average Lifespan')
-    ax1.set_title('Evolution Simulation Statistics')
-
-    line2, = ax2.plot(generations, food_eaten, 'g-')
-    ax2.set_ylabel('Average Food Eaten')
-
-    line3, = ax3.plot(generations, distances, 'r-')
-    ax3.set_ylabel('Average Distance')
-
-    line4, = ax4.plot(generations, remaining_food, 'm-')
-    ax4.set_xlabel('Generation')
-    ax4.set_ylabel('Remaining Food')
-
-    plt.tight_layout()
-
-    return fig, (line1, line2, line3, line4)
-
-def update_annot(line, ann, event):
-    x, y = line.get_data()
-    xdata = event.xdata
-    index = min(range(len(x)), key=lambda i: abs(x[i]-xdata))
-    ann.xy = (x[index], y[index])
-    text = f"Generation: {x[index]:.0f}\nValue: {y[index]:.2f}"
+LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
+LIVE_REFRESH_MS = 2000
+
+# Old text logs: "Generation N: Avg Lifespan: ..., Remaining Food: N" per line
+TEXT_LOG_PATTERN = r'Generation (\d+): Avg Lifespan: ([\d.]+), Avg Food Eaten: ([\d.]+), Avg Distance: ([\d.]+), Remaining Food: ([\d.]+)'
+TEXT_LOG_COLUMNS = ["generation", "avg_lifespan", "avg_food_eaten", "avg_distance", "remaining_food"]
+
+def parse_log_file(file):
+    rows = np.fromregex(file, TEXT_LOG_PATTERN, [(name, float) for name in TEXT_LOG_COLUMNS])
+    return {name: rows[name] for name in TEXT_LOG_COLUMNS}
+
+class LogTail:
+    # Follows a log that is still being written: every read() returns only the
+    # generations appended since the previous one.
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.is_stats = stats_log.is_stats_log(file_path)
+        self.rows = 0  # Stats log rows read so far
+        self.offset = 0  # Text log bytes read so far
+
+    def read(self):
+        if self.is_stats:
+            data = stats_log.load(self.file_path, start_row=self.rows)
+            self.rows += len(data["generation"])
+            if "island" in data:
+                # Island logs also hold a row per island; plot the ones for all islands
+                data = {name: values[data["island"] < 0] for name, values in data.items()}
+            return data
+        with open(self.file_path, 'rb') as file:
+            file.seek(self.offset)
+            text = file.read()
+        # Leave a line that is only half written for the next read
+        text = text[:text.rfind(b'\n') + 1]
+        self.offset += len(text)
+        return parse_log_file(io.BytesIO(text))
+
+def latest_log(log_dir=LOG_DIR):
+    paths = glob.glob(os.path.join(log_dir, "*.stats")) + glob.glob(os.path.join(log_dir, "*.log"))
+    return max(paths, key=os.path.getmtime) if paths else None
+
+class StatsPlot:
+    # The figure for one log. extend() adds newly read generations to the
+    # existing lines and bands instead of building a new figure.
+    def __init__(self, data):
+        self.data = data
+        panels = [("lifespan", 'b', 'Average Lifespan'), ("food_eaten", 'g', 'Average Food Eaten'),
+                  ("distance", 'r', 'Average Distance')]
+        has_fitness = "best_fitness" in data
+        self.fig, axes = plt.subplots(5 if has_fitness else 4, 1, figsize=(10, 10 if has_fitness else 8), sharex=True)
+
+        self.lines = []  # One line per panel, used for the hover annotations
+        self.hover_columns = []
+        self.series = []  # (line, column) for every line drawn from the data
+        self.bands = []  # (axes, low column, high column, collection)
+        for ax, (name, color, label) in zip(axes, panels):
+            self.add_line(ax, f"avg_{name}", color + '-')
+            # Stats logs also have the spread over the population
+            if f"p10_{name}" in data:
+                band = ax.fill_between([], [], [], color=color, alpha=0.2, linewidth=0)
+                self.bands.append((ax, f"p10_{name}", f"p90_{name}", band))
+                self.add_line(ax, f"max_{name}", color + ':', linewidth=0.8, hover=False)
+            ax.set_ylabel(label)
+        axes[0].set_title('Evolution Simulation Statistics')
+
+        self.add_line(axes[3], "remaining_food", 'm-')
+        axes[3].set_ylabel('Remaining Food')
+        if has_fitness:
+            self.add_line(axes[4], "best_fitness", 'k-')
+            axes[4].set_ylabel('Best Fitness')
+        axes[-1].set_xlabel('Generation')
+
+        self.resampling = False
+        self.update_artists()
+        plt.tight_layout()
+        axes[0].callbacks.connect('xlim_changed', self.on_xlim_changed)
+
+    def add_line(self, ax, column, style, hover=True, **kwargs):
+        line, = ax.plot([], [], style, **kwargs)
+        self.series.append((line, column))
+        if hover:
+            self.lines.append(line)
+            self.hover_columns.append(column)
+
+    def extend(self, new_data):
+        if not len(new_data["generation"]):
+            return False
+        self.data = {name: np.concatenate([values, new_data[name]]) for name, values in self.data.items()}
+        self.update_artists()
+        return True
+
+    def visible_range(self):
+        # Index range of the generations in view, plus one point either side
+        # so the lines run to the edges
+        generations = self.data["generation"]
+        ax = self.fig.axes[0]
+        if ax.get_autoscalex_on():
+            return 0, len(generations)
+        low, high = ax.get_xlim()
+        start = max(np.searchsorted(generations, low, side='left') - 1, 0)
+        end = min(np.searchsorted(generations, high, side='right') + 1, len(generations))
+        return start, end
+
+    def resample(self):
+        # Only about two points per horizontal pixel are drawn, however many
+        # generations are in view
+        start, end = self.visible_range()
+        buckets = max(int(self.fig.axes[0].bbox.width), 1)
+        generations = self.data["generation"][start:end]
+        for line, column in self.series:
+            values = self.data[column][start:end]
+            index = minmax_indices(values, buckets)
+            line.set_data(generations[index], values[index])
+        # The band polygons are updated in place, a new fill_between would
+        # rescale the axes in the middle of a pan
+        for ax, low, high, band in self.bands:
+            x, band_low, band_high = envelope(generations, self.data[low][start:end], self.data[high][start:end], buckets)
+            band.set_verts([np.column_stack([np.concatenate([x, x[::-1]]),
+                                             np.concatenate([band_high, band_low[::-1]])])])
+
+    def on_xlim_changed(self, ax):
+        # Called on every pan and zoom, and again when the autoscale in
+        # update_artists moves the limits itself
+        if not self.resampling:
+            self.resampling = True
+            self.resample()
+            self.resampling = False
+
+    def update_artists(self):
+        self.resampling = True
+        self.resample()
+        for ax in self.fig.axes:
+            ax.relim()
+            # relim() only looks at lines, the bands are added by hand
+            for band_ax, _, _, band in self.bands:
+                if band_ax is ax and len(self.data["generation"]):
+                    ax.update_datalim(band.get_paths()[0].vertices)
+            # Axes the user zoomed or panned keep their view
+            ax.autoscale_view()
+        self.resampling = False
+
+    def nearest(self, x):
+        # Index of the generation closest to x, by bisection
+        generations = self.data["generation"]
+        i = np.searchsorted(generations, x)
+        if i == len(generations) or (i > 0 and x - generations[i - 1] < generations[i] - x):
+            i -= 1
+        return i
+
+def minmax_indices(y, buckets):
+    # Indices of the smallest and largest value in each of `buckets` equal
+    # slices of y, in order, so the decimated line keeps every spike
+    n = len(y)
+    if n <= 2 * buckets:
+        return np.arange(n)
+    size = -(-n // buckets)
+    full = n // size
+    blocks = y[:full * size].reshape(full, size)
+    base = np.arange(full) * size
+    index = np.sort(np.column_stack([base + blocks.argmin(axis=1), base + blocks.argmax(axis=1)]), axis=1)
+    return np.unique(np.concatenate([[0], index.ravel(), np.arange(full * size, n), [n - 1]]))
+
+def envelope(x, low, high, buckets):
+    # A stepped band over `buckets` slices that covers low..high in each
+    n = len(x)
+    if n <= 2 * buckets:
+        return x, low, high
+    size = -(-n // buckets)
+    starts = np.arange(0, n, size)
+    band_low = np.minimum.reduceat(low, starts)
+    band_high = np.maximum.reduceat(high, starts)
+    return np.append(x[starts], x[-1]), np.append(band_low, band_low[-1]), np.append(band_high, band_high[-1])
+
+def update_annot(plot, column, ann, event):
+    index = plot.nearest(event.xdata)
+    x, y = plot.data["generation"][index], plot.data[column][index]
+    ann.xy = (x, y)
+    text = f"Generation: {x:.0f}\nValue: {y:.2f}"
     ann.set_text(text)
     ann.get_bbox_patch().set_alpha(0.4)
+    return index
 
-def hover(event, fig, lines, annotations):
-    vis = annotations[0].get_visible()
-    if event.inaxes in fig.axes:
-        for line, ann in zip(lines, annotations):
-            cont, _ = line.contains(event)
-            if cont:
-                update_annot(line, ann, event)
+def hover(event, plot, annotations):
+    # Only the panel under the mouse is looked at, and it is only redrawn
+    # when the nearest generation changes
+    fig = plot.fig
+    for ax, column, ann in zip(fig.axes, plot.hover_columns, annotations):
+        if event.inaxes is ax and len(plot.data["generation"]):
+            index = update_annot(plot, column, ann, event)
+            if not ann.get_visible() or index != ann.index:
+                ann.index = index
                 ann.set_visible(True)
                 fig.canvas.draw_idle()
-            else:
-                if vis:
-                    ann.set_visible(False)
-                    fig.canvas.draw_idle()
+        elif ann.get_visible():
+            ann.set_visible(False)
+            fig.canvas.draw_idle()
 
-def select_and_plot_log():
+def select_and_plot_log(file_path=None, live=False, interval=LIVE_REFRESH_MS):
     root = tk.Tk()
     root.withdraw()  # Hide the main window
 
-    log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
-    file_path = filedialog.askopenfilename(initialdir=log_dir, title="Select log file",
-                                           filetypes=(("Log files", "*.log"), ("All files", "*.*")))
+    if file_path is None:
+        file_path = filedialog.askopenfilename(initialdir=LOG_DIR, title="Select log file",
+                                               filetypes=(("Log files", "*.stats *.log"), ("All files", "*.*")))
 
     if file_path:
-        generations, lifespans, food_eaten, distances, remaining_food = parse_log_file(file_path)
+        tail = LogTail(file_path)
+        data = tail.read()
         
-        if not generations:
+        if not len(data["generation"]) and not live:
             print("No data found in the selected log file.")
             root.quit()
             return
 
-        fig, lines = plot_data(generations, lifespans, food_eaten, distances, remaining_food)
+        plot = StatsPlot(data)
+        fig, lines = plot.fig, plot.lines
 
         # Create annotations for each line
         annotations = []
@@ -94,15 +232,17 @@ def select_and_plot_log():
                               bbox=dict(boxstyle="round", fc="w"),
                               arrowprops=dict(arrowstyle="->"))
             ann.set_visible(False)
+            ann.index = None  # Generation it points at
             annotations.append(ann)
 
         # Create a new window to display the plot
         plot_window = tk.Toplevel(root)
-        plot_window.title("Evolution Simulation Statistics")
+        plot_window.title(f"Evolution Simulation Statistics - {os.path.basename(file_path)}"
+                          + (" (live)" if live else ""))
 
         canvas = FigureCanvasTkAgg(fig, master=plot_window)
         canvas.draw()
-        canvas.mpl_connect("motion_notify_event", lambda event: hover(event, fig, lines, annotations))
+        canvas.mpl_connect("motion_notify_event", lambda event: hover(event, plot, annotations))
 
         # Add toolbar
         toolbar = NavigationToolbar2Tk(canvas, plot_window)
@@ -111,6 +251,15 @@ def select_and_plot_log():
         canvas_widget = canvas.get_tk_widget()
         canvas_widget.pack(fill=tk.BOTH, expand=True)
 
+        # In live mode, read what was appended since the last refresh
+        def refresh():
+            if plot.extend(tail.read()):
+                canvas.draw_idle()
+            plot_window.after(interval, refresh)
+
+        if live:
+            plot_window.after(interval, refresh)
+
         # Set up proper closure of the application
         def on_closing():
             plot_window.destroy()
@@ -122,5 +271,20 @@ def select_and_plot_log():
         print("No file selected.")
         root.quit()
 
+def main():
+    parser = argparse.ArgumentParser(description="Plot the statistics of a simulation log.")
+    parser.add_argument("path", nargs="?", help="log file to plot, or 'latest' (default: choose in a dialog)")
+    parser.add_argument("--live", action="store_true",
+                        help="keep following the log as the simulation appends to it (default: the latest log)")
+    parser.add_argument("--interval", type=int, default=LIVE_REFRESH_MS, help="milliseconds between live refreshes")
+    args = parser.parse_args()
+
+    path = args.path
+    if path == "latest" or (path is None and args.live):
+        path = latest_log()
+        if path is None:
+            parser.error(f"no logs found in {LOG_DIR}")
+    select_and_plot_log(path, args.live, args.interval)
+
 if __name__ == "__main__":
-    select_and_plot_log()
\ No newline at end of file
+    main()
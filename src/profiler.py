@@ -0,0 +1,67 @@
+import json
+import time
+from collections import defaultdict
+
+# Phases timed per simulation tick, and per drawn frame
+TICK_PHASES = ["sensing", "inference", "actuation", "food", "generation", "spatial"]
+FRAME_PHASES = ["draw", "frame"]
+
+class Profiler:
+    # Phase timers and counters for the engine. When disabled every call is a
+    # single attribute check, so the hooks can stay in the hot loops.
+    def __init__(self, window=1.0):
+        self.enabled = False
+        self.window = window  # Seconds between refreshes of the live readout
+        self.last = 0
+        self.readout = {}
+        self.reset()
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.reset()
+
+    def reset(self):
+        self.times = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.window_start = time.perf_counter()
+
+    def start(self):
+        if self.enabled:
+            self.last = time.perf_counter()
+
+    def lap(self, phase):
+        # Adds the time since the previous start() or lap() to phase
+        if self.enabled:
+            now = time.perf_counter()
+            self.times[phase] += now - self.last
+            self.last = now
+
+    def add(self, phase, seconds):
+        if self.enabled:
+            self.times[phase] += seconds
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counts[name] += n
+
+    def summary(self):
+        # Milliseconds per tick (or per frame for draw and frame), plus totals
+        ticks = max(self.counts["ticks"], 1)
+        frames = max(self.counts["frames"], 1)
+        summary = {f"{phase}_ms": 1000 * self.times[phase] / ticks for phase in TICK_PHASES}
+        summary.update({f"{phase}_ms": 1000 * self.times[phase] / frames for phase in FRAME_PHASES})
+        summary.update(self.counts)
+        return summary
+
+    def tick_window(self):
+        # Called once per frame: refreshes the readout shown in the info panel
+        if self.enabled and time.perf_counter() - self.window_start >= self.window:
+            self.readout = self.summary()
+            self.reset()
+
+    def write_metrics(self, file, **fields):
+        # Appends the totals since the last call as one JSON line, then starts over
+        record = dict(fields, **self.summary())
+        file.write(json.dumps(record) + "\n")
+        file.flush()
+        self.reset()
@@ -0,0 +1,293 @@
+import pygame
+import numpy as np
+from config import *
+from profiler import TICK_PHASES, FRAME_PHASES
+from vision import VisionTable
+
+class Renderer:
+    # Keeps what is on screen between frames: food lives on its own layer that
+    # only changes where food was added or eaten, and each frame only the areas
+    # that changed are redrawn. draw() returns those areas for
+    # pygame.display.update(), or None when the whole window was redrawn.
+    # Only the part of the world in the engine's camera view is drawn, so the
+    # cost follows the view, not the size of the world.
+    def __init__(self, engine):
+        self.engine = engine
+        self.fonts = {}
+        self.texts = {}
+        self.food_layer = None
+        self.world_rect = None
+        self.cell_rects = []  # Areas the cells covered last frame, to erase them
+        self.full_redraw = True
+        self.vision_drawn = False
+        self.panel_state = None
+        self.layer_view = None  # Camera state the food layer was drawn for
+        self.vision = VisionTable(vision_range=1)
+        self.ray_scale = None
+        engine.food.track_changes = True
+        engine.food.reset = True
+
+    def invalidate(self):
+        # Redraw everything next frame, e.g. after the window was covered
+        self.full_redraw = True
+
+    def font(self, size):
+        if size not in self.fonts:
+            self.fonts[size] = pygame.font.Font(None, size)
+        return self.fonts[size]
+
+    def text(self, text, size, color=BLACK):
+        # Rendered text that repeats from frame to frame (labels, stats)
+        key = (text, size, color)
+        if key not in self.texts:
+            if len(self.texts) > 1000:
+                self.texts.clear()
+            self.texts[key] = self.font(size).render(text, True, color)
+        return self.texts[key]
+
+    def update_food_layer(self):
+        # Returns the screen areas that changed, or None if the layer was rebuilt
+        food = self.engine.food
+        camera = self.engine.camera
+        size = (camera.view_width, camera.view_height)
+        changes = food.changes
+        food.changes = []
+        if changes:
+            # Changed squares in view, as offsets from its top-left. A view as
+            # wide as the world can show a square at both edges.
+            x, y = np.concatenate([c[0] for c in changes]), np.concatenate([c[1] for c in changes])
+            x, y = camera.offsets(*np.divmod(np.unique(x * food.height + y), food.height))
+            x = np.concatenate([x, x - food.width, x, x - food.width])
+            y = np.concatenate([y, y, y - food.height, y - food.height])
+            width, height = camera.size()
+            visible = (x > -1) & (x < width) & (y > -1) & (y < height)
+            x, y = x[visible], y[visible]
+        if (self.food_layer is None or self.food_layer.get_size() != size or food.reset
+                or self.layer_view != camera.state() or (changes and len(x) > DIRTY_RECT_LIMIT)):
+            if self.food_layer is None or self.food_layer.get_size() != size:
+                self.food_layer = pygame.Surface(size)
+                self.world_rect = pygame.Rect((0, LABEL_HEIGHT), size)
+            self.draw_food(0, 0, *size)
+            food.reset = False
+            self.layer_view = camera.state()
+            return None
+
+        rects = []
+        if changes:
+            # Each changed square is redrawn from the grid as it is now
+            for left, top, right, bottom in zip(np.floor(x * camera.scale).tolist(), np.floor(y * camera.scale).tolist(),
+                                                np.ceil((x + 1) * camera.scale).tolist(), np.ceil((y + 1) * camera.scale).tolist()):
+                rect = pygame.Rect(left, top, right - left, bottom - top).clip(self.food_layer.get_rect())
+                if rect.width and rect.height:
+                    self.draw_food(*rect)
+                    rects.append(rect.move(self.world_rect.topleft))
+        return rects
+
+    def draw_food(self, left, top, width, height):
+        # Fills an area of the food layer, each pixel from the square it shows
+        food = self.engine.food
+        camera = self.engine.camera
+        columns = camera.columns(np.arange(left, left + width))
+        rows = camera.rows(np.arange(top, top + height))
+        colors = np.array([self.food_layer.map_rgb(WHITE), self.food_layer.map_rgb(DARK_BLUE)])
+        pixels = pygame.surfarray.pixels2d(self.food_layer)
+        pixels[left:left + width, top:top + height] = colors[food.grid[np.ix_(columns, rows)].view(np.uint8)]
+        del pixels  # Unlocks the layer
+
+    def draw(self, screen):
+        food_rects = self.update_food_layer()
+        full = (self.full_redraw or food_rects is None or self.engine.show_vision or self.vision_drawn
+                or len(self.cell_rects) > DIRTY_RECT_LIMIT)
+
+        if full:
+            screen.fill(WHITE)
+            screen.blit(self.food_layer, self.world_rect)
+            dirty = None
+        else:
+            # Put the background back where the cells were, and where food changed
+            dirty = food_rects
+            for rect in self.cell_rects:
+                rect = rect.clip(self.world_rect)
+                screen.blit(self.food_layer, rect, rect.move(-self.world_rect.x, -self.world_rect.y))
+                dirty.append(rect)
+            for rect in food_rects:
+                screen.blit(self.food_layer, rect, rect.move(-self.world_rect.x, -self.world_rect.y))
+
+        screen.set_clip(self.world_rect)
+        self.cell_rects = self.draw_cells(screen)
+        screen.set_clip(None)
+        self.vision_drawn = self.engine.show_vision
+
+        header_rect = pygame.Rect(0, 0, self.world_rect.width, LABEL_HEIGHT)
+        screen.fill(WHITE, header_rect)
+        info_text = f"Cells: {self.engine.cell_count()} | Food: {self.engine.food.count()} | Generation: {self.engine.generation} | Time: {self.engine.simulated_time:.1f}"
+        screen.blit(self.font(36).render(info_text, True, GREY), (10, 10))
+
+        # The panel only changes with the stats and profile, or every frame while a cell is selected
+        panel_state = (self.engine.selected_cell is None, tuple(self.engine.stats.items()), self.engine.profiler.enabled,
+                       tuple(self.engine.profiler.readout.items()))
+        panel_changed = full or self.engine.selected_cell or panel_state != self.panel_state
+        if panel_changed:
+            self.draw_info_panel(screen)
+            self.panel_state = panel_state
+        self.full_redraw = False
+
+        if dirty is None:
+            return None
+        dirty.extend(self.cell_rects)
+        dirty.append(header_rect)
+        if panel_changed:
+            dirty.append(pygame.Rect(WIDTH - INFO_PANEL_WIDTH, 0, INFO_PANEL_WIDTH, HEIGHT))
+        return dirty if len(dirty) <= DIRTY_RECT_LIMIT else None
+
+    def draw_cells(self, screen):
+        # Returns the areas drawn over. Only cells in view, or close enough
+        # for their vision rays to reach into it, are drawn.
+        camera = self.engine.camera
+        margin = 1 + (VISION_RANGE if self.engine.show_vision else 0)
+        width, height = camera.size()
+        ids = np.sort(self.engine.spatial.query_rect(camera.x - margin, camera.y - margin,
+                                                     width + 2 * margin, height + 2 * margin))
+        self.engine.profiler.count("cells_drawn", len(ids))
+        if not len(ids):
+            return []
+        x, y, energy, orientation, selected = self.engine.drawable_arrays(ids)
+        x, y = camera.offsets(x, y, margin)
+        if self.engine.show_vision:
+            self.draw_vision(screen, x, y, orientation)
+
+        rects = []
+        left, top = self.world_rect.topleft
+        radius = max(int(camera.scale) // 2, 1)
+        centers_x = ((x + 0.5) * camera.scale).astype(int) + left
+        centers_y = ((y + 0.5) * camera.scale).astype(int) + top
+        # From red when starving to green when full
+        share = (energy / CELL_ENERGY_MAX)[:, None]
+        colors = (np.array(RED) * (1 - share) + np.array(GREEN) * share).astype(int)
+        for cell_center, color, is_selected in zip(zip(centers_x.tolist(), centers_y.tolist()), map(tuple, colors.tolist()),
+                                                   selected.tolist()):
+            rects.append(pygame.draw.circle(screen, color, cell_center, radius))
+            
+            # Draw a black circle around the selected cell
+            if is_selected:
+                rects.append(pygame.draw.circle(screen, BLACK, cell_center, camera.scale * 0.75 + 2, 2))
+        return rects
+
+    def draw_vision(self, screen, x, y, orientation):
+        # Every ray of every cell in one pass: a point for each pixel along the
+        # ray, wrapped around the world edges, written straight into the screen.
+        # x, y are offsets from the top-left of the view, in squares.
+        camera = self.engine.camera
+        if self.ray_scale != camera.scale:
+            # Pixel offsets along every ray for each quantized orientation
+            steps = np.arange(int(VISION_RANGE * camera.scale) + 1)
+            self.ray_dx = (self.vision.dx * steps).astype(np.float32)
+            self.ray_dy = (self.vision.dy * steps).astype(np.float32)
+            self.ray_scale = camera.scale
+        world_width = int(round(camera.world_width * camera.scale))
+        world_height = int(round(camera.world_height * camera.scale))
+        # Whole world sizes, enough that nothing is negative before the integer wrap
+        reach = (VISION_RANGE + 2) * camera.scale
+        shift_x = world_width * (1 + int(reach // world_width))
+        shift_y = world_height * (1 + int(reach // world_height))
+        left, top = self.world_rect.topleft
+        pixels = pygame.surfarray.pixels2d(screen)
+        color = screen.map_rgb(GREY)
+        for start in range(0, len(x), VISION_DRAW_BATCH):
+            batch = slice(start, start + VISION_DRAW_BATCH)
+            q = self.vision.quantize(orientation[batch])
+            cx = ((x[batch] + 0.5) * camera.scale + shift_x).astype(np.float32)
+            cy = ((y[batch] + 0.5) * camera.scale + shift_y).astype(np.float32)
+            px = ((self.ray_dx[q] + cx[:, None, None]).astype(np.int32) % world_width).ravel()
+            py = ((self.ray_dy[q] + cy[:, None, None]).astype(np.int32) % world_height).ravel()
+            visible = (px < camera.view_width) & (py < camera.view_height)
+            pixels[px[visible] + left, py[visible] + top] = color
+        del pixels  # Unlocks the screen
+
+    def draw_info_panel(self, screen):
+        panel_rect = pygame.Rect(WIDTH - INFO_PANEL_WIDTH, 0, INFO_PANEL_WIDTH, HEIGHT)
+        pygame.draw.rect(screen, LIGHT_BLUE, panel_rect)
+
+        if self.engine.selected_cell:
+            self.draw_cell_info(screen, self.engine.selected_cell)
+            self.draw_neural_network(screen, self.engine.selected_cell)
+
+        # Draw stats
+        y = HEIGHT - 120
+        for stat, value in self.engine.stats.items():
+            text = self.text(f"{stat.replace('_', ' ').title()}: {value:.2f}", 24)
+            screen.blit(text, (WIDTH - INFO_PANEL_WIDTH + 10, y))
+            y += 30
+
+        if self.engine.profiler.enabled:
+            self.draw_profile(screen)
+
+    def draw_profile(self, screen):
+        readout = self.engine.profiler.readout
+        font = self.font(20)
+        lines = ["Profile (per tick / per frame):"]
+        for phase in TICK_PHASES + FRAME_PHASES:
+            lines.append(f"  {phase}: {readout.get(phase + '_ms', 0):.3f} ms")
+        ticks = max(readout.get("ticks", 0), 1)
+        lines.append(f"  ticks: {readout.get('ticks', 0)}  frames: {readout.get('frames', 0)}")
+        lines.append(f"  cells/tick: {readout.get('cells_processed', 0) / ticks:.0f}")
+        lines.append(f"  food probes/tick: {readout.get('food_probes', 0) / ticks:.0f}")
+        lines.append(f"  cells drawn/frame: {readout.get('cells_drawn', 0) / max(readout.get('frames', 0), 1):.0f}")
+        y = 440
+        for line in lines:
+            screen.blit(font.render(line, True, BLACK), (WIDTH - INFO_PANEL_WIDTH + 10, y))
+            y += 20
+
+    def draw_neural_network(self, screen, cell):
+        activations = cell.get_neuron_activations()
+        weights = cell.brain.get_weights()
+        layers = weights if isinstance(weights, list) else [weights]
+
+        input_y = 200
+        output_y = 200
+        input_x = WIDTH - INFO_PANEL_WIDTH + 50
+        output_x = WIDTH - 50
+
+        # One column of (x, y, value) neurons per layer, hidden layers spread evenly in between
+        input_values = [value for _, value in activations["inputs"]]
+        output_values = [value for _, value in activations["outputs"]]
+        hidden = activations.get("hidden", []) if input_values else []
+        columns = [[(input_x, input_y + i * 30, value) for i, value in enumerate(input_values)]]
+        for k, values in enumerate(hidden):
+            x = input_x + (output_x - input_x) * (k + 1) // (len(hidden) + 1)
+            spacing = min(30, 210 / max(len(values) - 1, 1))
+            top = input_y + 105 - spacing * (len(values) - 1) / 2
+            columns.append([(x, int(top + i * spacing), value) for i, value in enumerate(values)])
+        columns.append([(output_x, output_y + j * 100, value) for j, value in enumerate(output_values)])
+
+        for k in range(len(columns) - 1):
+            for i, (x1, y1, value1) in enumerate(columns[k]):
+                for j, (x2, y2, value2) in enumerate(columns[k + 1]):
+                    width = int(abs(layers[k][i, j]) * 5)
+                    color = tuple(int(255 * (abs(value1) + abs(value2)) / 2) for _ in range(3))
+                    pygame.draw.line(screen, color, (x1 + 10, y1), (x2 - 10, y2), width)
+
+        for column in columns[1:-1]:
+            for x, y, value in column:
+                color = tuple(int(255 * abs(value)) for _ in range(3))
+                pygame.draw.circle(screen, color, (x, y), 6)
+
+        for i, (label, value) in enumerate(activations["inputs"]):
+            color = tuple(int(255 * abs(value)) for _ in range(3))
+            pygame.draw.circle(screen, color, (input_x, input_y + i * 30), 10)
+            text = self.text(label, 20)
+            screen.blit(text, (input_x - 40, input_y + i * 30 - 5))
+
+        for j, (label, value) in enumerate(activations["outputs"]):
+            color = tuple(int(255 * abs(value)) for _ in range(3))
+            pygame.draw.circle(screen, color, (output_x, output_y + j * 100), 10)
+            text = self.text(label, 20)
+            screen.blit(text, (output_x + 15, output_y + j * 100 - 5))
+
+    def draw_cell_info(self, screen, cell):
+        font = self.font(24)
+        y = 10
+        for key, value in cell.get_info().items():
+            text = font.render(f"{key}: {value}", True, BLACK)
+            screen.blit(text, (WIDTH - INFO_PANEL_WIDTH + 10, y))
+            y += 30
@@ -0,0 +1,42 @@
+import time
+from config import *
+
+class FixedStepScheduler:
+    # Runs the engine in fixed 1/FPS ticks. The speed setting decides how many
+    # ticks run per frame rather than how big each tick is, so every speed
+    # gives the same simulation. In turbo mode it keeps ticking until the
+    # frame budget for TURBO_FPS is spent and only then lets a frame be drawn.
+    def __init__(self, engine):
+        self.engine = engine
+        self.turbo = False
+        self.accumulator = 0
+        self.steps_last_frame = 0
+
+    def toggle_turbo(self):
+        self.turbo = not self.turbo
+        self.accumulator = 0
+
+    def run_frame(self):
+        engine = self.engine
+        steps = 0
+        if engine.paused:
+            self.accumulator = 0
+        elif self.turbo:
+            deadline = time.perf_counter() + 1 / TURBO_FPS
+            while time.perf_counter() < deadline:
+                engine.update(1)
+                steps += 1
+        else:
+            self.accumulator += engine.speed
+            due = int(self.accumulator)
+            self.accumulator -= due
+            deadline = time.perf_counter() + 1 / FPS
+            while steps < due:
+                engine.update(1)
+                steps += 1
+                # Too slow to keep up: drop the remaining ticks rather than
+                # piling them onto the next frame
+                if time.perf_counter() >= deadline:
+                    break
+        self.steps_last_frame = steps
+        return steps
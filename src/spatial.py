@@ -0,0 +1,89 @@
+import numpy as np
+from config import *
+
+class SpatialHash:
+    # Uniform grid of buckets over the wrapping world. Cells are kept sorted by
+    # bucket, with the offset where each bucket starts, so the cells of a bucket
+    # are one slice and any number of cells can share a square.
+    def __init__(self, width, height, bucket_size=None):
+        if bucket_size is None:
+            bucket_size = SPATIAL_BUCKET_SIZE
+        self.width = width
+        self.height = height
+        # Whole buckets only, so the grid wraps exactly like the world
+        self.columns = max(int(width // bucket_size), 1)
+        self.rows = max(int(height // bucket_size), 1)
+        self.bucket_size = max(width / self.columns, height / self.rows)
+        self.rebuild(np.empty(0), np.empty(0))
+
+    def bucket_coords(self, x, y):
+        return (np.floor(np.asarray(x) * self.columns / self.width).astype(np.int64) % self.columns,
+                np.floor(np.asarray(y) * self.rows / self.height).astype(np.int64) % self.rows)
+
+    def rebuild(self, x, y, ids=None):
+        # ids are what queries return for each position (default: its index)
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.ids = np.arange(len(self.x)) if ids is None else np.asarray(ids)
+        bx, by = self.bucket_coords(self.x, self.y)
+        buckets = bx * self.rows + by
+        # A stable sort of 16-bit keys is a radix sort, linear in the number of cells
+        keys = buckets.astype(np.uint16) if self.columns * self.rows <= 1 << 16 else buckets
+        self.order = np.argsort(keys, kind="stable")
+        self.counts = np.bincount(buckets, minlength=self.columns * self.rows)
+        self.starts = np.concatenate([[0], np.cumsum(self.counts)])
+
+    def density(self):
+        # Number of cells per bucket, as a (columns, rows) grid
+        return self.counts.reshape(self.columns, self.rows)
+
+    def distance(self, positions, x, y):
+        # Distances across the wrapping edges, from (x, y) to the given positions
+        dx = (self.x[positions] - x) % self.width
+        dy = (self.y[positions] - y) % self.height
+        return np.hypot(np.minimum(dx, self.width - dx), np.minimum(dy, self.height - dy))
+
+    def query_radius(self, x, y, radius):
+        # ids and distances of everything within radius of (x, y)
+        bx_low, by_low = self.bucket_coords(x - radius, y - radius)
+        span_x = min(int(np.ceil(2 * radius * self.columns / self.width)) + 1, self.columns)
+        span_y = min(int(np.ceil(2 * radius * self.rows / self.height)) + 1, self.rows)
+        columns = (bx_low + np.arange(span_x)) % self.columns
+        rows = (by_low + np.arange(span_y)) % self.rows
+        buckets = (columns[:, None] * self.rows + rows).ravel()
+        positions = [self.order[self.starts[b]:self.starts[b + 1]] for b in buckets.tolist() if self.counts[b]]
+        if not positions:
+            return self.ids[:0], np.empty(0)
+        positions = np.concatenate(positions)
+        distance = self.distance(positions, x, y)
+        inside = distance <= radius
+        return self.ids[positions[inside]], distance[inside]
+
+    def query_rect(self, x, y, width, height):
+        # ids of everything inside the rectangle from (x, y), wrapping at the
+        # edges. The buckets it covers are gathered in one go, however many.
+        bx_low, by_low = self.bucket_coords(x, y)
+        span_x = min(int(np.ceil(width * self.columns / self.width)) + 1, self.columns)
+        span_y = min(int(np.ceil(height * self.rows / self.height)) + 1, self.rows)
+        columns = (bx_low + np.arange(span_x)) % self.columns
+        rows = (by_low + np.arange(span_y)) % self.rows
+        buckets = (columns[:, None] * self.rows + rows).ravel()
+        counts = self.counts[buckets]
+        # Position k of the gather is start of its bucket + its rank within the bucket
+        ends = np.cumsum(counts)
+        positions = self.order[np.arange(ends[-1]) + np.repeat(self.starts[buckets] - ends + counts, counts)]
+        inside = (((self.x[positions] - x) % self.width < width)
+                  & ((self.y[positions] - y) % self.height < height))
+        return self.ids[positions[inside]]
+
+    def nearest(self, x, y, k=1, max_radius=None):
+        # ids and distances of the k nearest, closest first. The search circle
+        # doubles until it holds k, everything outside it is further away.
+        limit = np.hypot(self.width, self.height) / 2 if max_radius is None else max_radius
+        radius = min(self.bucket_size, limit)
+        while True:
+            ids, distance = self.query_radius(x, y, radius)
+            if len(ids) >= k or radius >= limit:
+                order = np.argsort(distance, kind="stable")[:k]
+                return ids[order], distance[order]
+            radius = min(radius * 2, limit)
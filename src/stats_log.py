@@ -0,0 +1,101 @@
+import json
+import os
+import time
+import numpy as np
+from config import *
+
+# Per-generation stats log: a one-line text header naming the columns, then
+# fixed-size rows of little-endian float64, appended as the run goes. A log of
+# any length loads with a single np.fromfile.
+MAGIC = "EVOSTATS"
+VERSION = 1
+PERCENTILES = [0, 10, 50, 90, 100]
+DISTRIBUTIONS = ["lifespan", "food_eaten", "distance"]
+COLUMNS = (["generation", "population", "survivors"]
+           + [f"avg_{name}" for name in DISTRIBUTIONS]
+           + [f"{label}_{name}" for name in DISTRIBUTIONS for label in ["min", "p10", "p50", "p90", "max"]]
+           + ["remaining_food", "best_fitness"])
+DTYPE = np.dtype("<f8")
+
+def generation_row(generation, stats, values):
+    # values holds one array per individual of the generation: lifespan,
+    # food_eaten, distance and fitness, plus the number of survivors
+    row = dict.fromkeys(COLUMNS, np.nan)
+    row["generation"] = generation
+    row["population"] = len(values["lifespan"])
+    row["survivors"] = values["survivors"]
+    row["remaining_food"] = stats["remaining_food"]
+    for name in DISTRIBUTIONS:
+        row[f"avg_{name}"] = stats[f"avg_{name}"]
+        if len(values[name]):
+            for label, value in zip(["min", "p10", "p50", "p90", "max"], np.percentile(values[name], PERCENTILES)):
+                row[f"{label}_{name}"] = value
+    if len(values["fitness"]):
+        row["best_fitness"] = np.max(values["fitness"])
+    return [row[name] for name in COLUMNS]
+
+class StatsLog:
+    # Rows are kept in a buffer and written in batches of STATS_LOG_BATCH, or
+    # sooner once STATS_LOG_FLUSH_SECONDS have passed so a live plot keeps up.
+    # With resume_generation, an existing log is continued from that
+    # generation on. Rows the run wrote after its checkpoint are dropped, as
+    # they are about to be run again.
+    def __init__(self, path, resume_generation=None, columns=COLUMNS):
+        self.name = path
+        self.columns = columns
+        if resume_generation is not None and os.path.getsize(path):
+            with open(path, "rb") as f:
+                columns, offset = read_header(f)
+            if columns != self.columns:
+                raise ValueError(f"{path} has different columns, can't continue it")
+            kept = int(np.count_nonzero(load(path)["generation"] < resume_generation))
+            self.file = open(path, "r+b")
+            self.file.truncate(offset + kept * len(columns) * DTYPE.itemsize)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file = open(path, "wb")
+            header = json.dumps({"format": MAGIC, "version": VERSION, "columns": columns})
+            self.file.write(header.encode() + b"\n")
+            self.file.flush()
+        self.buffer = np.empty((STATS_LOG_BATCH, len(columns)), dtype=DTYPE)
+        self.rows = 0
+        self.last_flush = time.monotonic()
+
+    def append(self, row):
+        self.buffer[self.rows] = row
+        self.rows += 1
+        if self.rows == len(self.buffer) or time.monotonic() - self.last_flush >= STATS_LOG_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        if self.rows and not self.file.closed:
+            self.file.write(self.buffer[:self.rows].tobytes())
+            self.file.flush()
+            self.rows = 0
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+def is_stats_log(path):
+    with open(path, "rb") as f:
+        return f.read(64).startswith(f'{{"format": "{MAGIC}"'.encode())
+
+def read_header(f):
+    # Returns the column names and the offset of the first row
+    header = json.loads(f.readline())
+    if header.get("format") != MAGIC:
+        raise ValueError(f"{f.name} is not a stats log")
+    return header["columns"], f.tell()
+
+def load(path, start_row=0):
+    # All rows from start_row on as {column: array}. A row still being
+    # written is left out.
+    with open(path, "rb") as f:
+        columns, offset = read_header(f)
+    row_size = len(columns) * DTYPE.itemsize
+    data = np.fromfile(path, dtype=DTYPE, offset=offset + start_row * row_size)
+    data = data[:len(data) // len(columns) * len(columns)].reshape(-1, len(columns))
+    return {name: data[:, i] for i, name in enumerate(columns)}
@@ -0,0 +1,118 @@
+import argparse
+import ast
+import csv
+import itertools
+import multiprocessing as mp
+import random
+import sys
+import types
+import numpy as np
+import config
+from engine import log_path
+
+STAT_KEYS = ["avg_lifespan", "avg_food_eaten", "avg_distance", "remaining_food"]
+
+def apply_overrides(overrides):
+    # Every module pulls the settings in with `from config import *`, so a
+    # new value has to be written into each module that holds a copy of it.
+    for name, value in overrides.items():
+        if not hasattr(config, name):
+            raise KeyError(f"Unknown config setting: {name}")
+        old = getattr(config, name)
+        for module in list(sys.modules.values()):
+            if isinstance(module, types.ModuleType) and vars(module).get(name, value) is old:
+                setattr(module, name, value)
+        setattr(config, name, value)
+
+def parse_value(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+def grid_configs(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def random_configs(ranges, samples, rng):
+    configs = []
+    for _ in range(samples):
+        overrides = {}
+        for name, (low, high) in ranges.items():
+            if isinstance(low, int) and isinstance(high, int):
+                overrides[name] = rng.randint(low, high)
+            else:
+                overrides[name] = rng.uniform(low, high)
+        configs.append(overrides)
+    return configs
+
+def run_config(job):
+    run_id, overrides, generations, engine_kind, seed = job
+    apply_overrides(overrides)
+
+    # Imported after the overrides so nothing is built from the defaults
+    from headless import create_engine, run
+    engine = create_engine(engine_kind, seed)
+    rows = []
+    run(engine, generations=generations,
+        on_generation=lambda e, generation: rows.append(
+            dict(run=run_id, **overrides, generation=generation, **{key: e.stats[key] for key in STAT_KEYS})))
+    engine.log_file.close()
+    return rows
+
+def run_sweep(configs, generations, workers=None, engine_kind="array", seed=None):
+    path = log_path("sweep", "csv")
+    names = sorted({name for overrides in configs for name in overrides})
+    seeds = np.random.SeedSequence(config.SEED if seed is None else seed).generate_state(len(configs))
+    jobs = [(i, overrides, generations, engine_kind, int(run_seed))
+            for i, (overrides, run_seed) in enumerate(zip(configs, seeds))]
+
+    # One process per configuration, so no override leaks into the next run
+    with mp.Pool(workers, maxtasksperchild=1) as pool, open(path, "w", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=["run"] + names + ["generation"] + STAT_KEYS, restval="")
+        writer.writeheader()
+        for rows in pool.imap_unordered(run_config, jobs):
+            writer.writerows(rows)
+            out.flush()
+            if rows:
+                print(f"Run {rows[0]['run']} done: final Avg Food Eaten {rows[-1]['avg_food_eaten']:.2f}")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many config.py settings in parallel, headless.")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                        help="try every listed value (combined with the other --grid settings)")
+    parser.add_argument("--random", action="append", default=[], metavar="NAME=LOW:HIGH",
+                        help="sample uniformly from a range, see --samples")
+    parser.add_argument("--samples", type=int, default=10, help="random configurations to draw per grid point")
+    parser.add_argument("--generations", type=int, default=20)
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--engine", choices=["array", "object"], default="array")
+    parser.add_argument("--seed", type=int, default=config.SEED,
+                        help="seed for sampling configurations and for the runs")
+    args = parser.parse_args()
+
+    grid = {}
+    for item in args.grid:
+        name, values = item.split("=", 1)
+        grid[name] = [parse_value(value) for value in values.split(",")]
+    ranges = {}
+    for item in args.random:
+        name, bounds = item.split("=", 1)
+        low, high = bounds.split(":")
+        ranges[name] = (parse_value(low), parse_value(high))
+    for name in list(grid) + list(ranges):
+        if not hasattr(config, name):
+            parser.error(f"unknown config setting: {name}")
+
+    configs = grid_configs(grid)
+    if ranges:
+        rng = random.Random(args.seed)
+        configs = [dict(base, **sample) for base in configs for sample in random_configs(ranges, args.samples, rng)]
+
+    print(f"Running {len(configs)} configurations for {args.generations} generations each")
+    path = run_sweep(configs, args.generations, args.workers, args.engine, args.seed)
+    print(f"Results written to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import re
+import socket
+import struct
+import threading
+import time
+import numpy as np
+from config import *
+from spatial import SpatialHash
+from worker import SnapshotBuffer, food_updates
+
+# Wire format. Every message is a type byte followed by its payload. Over
+# plain TCP the client opens with MAGIC and each message is preceded by its
+# length as 4 bytes; over a WebSocket each message is one binary frame.
+#
+# HELLO    JSON: world size, POSITION_SCALE, CELL_ENERGY_MAX, stat names
+# KEYFRAME FRAME_HEADER, x and y (uint32), energy and orientation (uint8), food
+# DELTA    FRAME_HEADER, which cells of the previous frame are still alive
+#          (packed bits), then x and y (int16), energy and orientation (uint8)
+#          as differences from the previous frame, food
+# STATS    generation (uint32), then each stat as float64
+#
+# Positions are in 1/POSITION_SCALE squares, energy in 1/255 of
+# CELL_ENERGY_MAX and orientation in 1/256 of a turn. The food part is the
+# whole grid as packed bits if the header says so, then the changed squares
+# (uint32 x * height + y) and their new state (packed bits).
+MAGIC = b"EVO1"
+HELLO, KEYFRAME, DELTA, STATS = 1, 2, 3, 4
+POSITION_SCALE = 64
+FRAME_HEADER = struct.Struct("<IdIIIB")  # generation, simulated time, cells, food, food changes, grid follows
+STATS_HEADER = struct.Struct("<I")
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+def wrapped(d, size):
+    # Differences across the wrapping edge of a world size units wide
+    return (d + size // 2) % size - size // 2
+
+class CellState:
+    # The cells of one published frame, quantized as they are sent
+    def __init__(self, generation, simulated_time, keys, x, y, energy, orientation, food_count):
+        self.generation = generation
+        self.simulated_time = simulated_time
+        self.keys = keys
+        self.raw = (x, y, energy, orientation)
+        self.food_count = food_count
+
+    def quantize(self, width, height):
+        x, y, energy, orientation = self.raw
+        self.x = np.round(x * POSITION_SCALE).astype(np.int64) % (width * POSITION_SCALE)
+        self.y = np.round(y * POSITION_SCALE).astype(np.int64) % (height * POSITION_SCALE)
+        self.energy = np.clip(np.round(energy / CELL_ENERGY_MAX * 255), 0, 255).astype(np.uint8)
+        self.orientation = (np.round(orientation * 256 / 360).astype(np.int64) % 256).astype(np.uint8)
+        self.raw = None
+
+class Viewer:
+    # One connected client, with what it still has to be sent
+    def __init__(self, writer, websocket):
+        self.writer = writer
+        self.websocket = websocket
+        self.ready = asyncio.Event()  # A frame was published since the last one sent
+        self.previous = None  # The last CellState sent, to encode the next one against
+        self.food_reset = True  # Send the whole grid next time
+        self.food_changes = []
+        self.food_pending = 0
+        self.stats = collections.deque(maxlen=TELEMETRY_STATS_KEPT)
+        self.published = 0
+
+    def send(self, kind, body):
+        payload = bytes([kind]) + body
+        if self.websocket:
+            n = len(payload)
+            if n < 126:
+                header = struct.pack(">BB", 0x82, n)
+            elif n < 1 << 16:
+                header = struct.pack(">BBH", 0x82, 126, n)
+            else:
+                header = struct.pack(">BBQ", 0x82, 127, n)
+        else:
+            header = struct.pack("<I", len(payload))
+        self.writer.write(header + payload)
+
+    def add_food(self, index, values, limit):
+        # Past limit changes the whole grid is smaller to send
+        if self.food_reset:
+            return
+        self.food_changes.append((index, values))
+        self.food_pending += len(index)
+        if self.food_pending > limit:
+            self.food_reset = True
+            self.food_changes = []
+            self.food_pending = 0
+
+class TelemetryServer:
+    # Streams an engine to any number of viewers over TCP or WebSockets. The
+    # connections are served by an asyncio loop on its own thread; publish()
+    # only hands over copies of the arrays, so the simulation never waits for
+    # a viewer. A viewer that reads slower than frames are published gets the
+    # latest one whenever its socket has room, and the ones in between are
+    # dropped.
+    def __init__(self, engine, host=TELEMETRY_HOST, port=TELEMETRY_PORT):
+        self.width = engine.width
+        self.height = engine.height
+        self.stat_names = list(engine.stats)
+        self.grid = None
+        self.state = None
+        # The stats the engine shows now, for viewers that connect before a generation ends
+        self.last_stats = (engine.generation - 1, self.stat_values(engine))
+        self.viewers = set()
+        self.last_publish = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        engine.food.track_changes = True
+        engine.food.reset = True
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self.serve, host, port), self.loop).result()
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def stat_values(self, engine):
+        return np.array([engine.stats[name] for name in self.stat_names], dtype=np.float64)
+
+    def publish(self, engine, force=False):
+        # Called after every tick; publishes at most TELEMETRY_FPS frames a second
+        now = time.perf_counter()
+        if not force and now - self.last_publish < 1 / TELEMETRY_FPS:
+            return
+        self.last_publish = now
+        ids = engine.spatial.ids
+        x, y, energy, orientation, _ = engine.drawable_arrays(ids)
+        state = CellState(engine.generation, engine.simulated_time, engine.cell_keys(ids),
+                          x, y, energy, orientation, engine.food.count())
+        changes, grid = food_updates(engine.food)
+        self.loop.call_soon_threadsafe(self.broadcast, state, changes, grid)
+
+    def publish_stats(self, engine, generation):
+        # Called when a generation ends; every viewer gets every generation's stats
+        self.loop.call_soon_threadsafe(self.broadcast_stats, generation, self.stat_values(engine))
+
+    def broadcast(self, state, changes, grid):
+        state.quantize(self.width, self.height)
+        if grid is not None:
+            self.grid = grid
+            for viewer in self.viewers:
+                viewer.food_reset = True
+                viewer.food_changes = []
+                viewer.food_pending = 0
+        limit = self.width * self.height // 32
+        for x, y, values in changes:
+            self.grid[x, y] = values
+            index = (x * self.height + y).astype(np.uint32)
+            for viewer in self.viewers:
+                viewer.add_food(index, values, limit)
+        self.state = state
+        for viewer in self.viewers:
+            viewer.published += 1
+            viewer.ready.set()
+
+    def broadcast_stats(self, generation, values):
+        self.last_stats = (generation, values)
+        for viewer in self.viewers:
+            viewer.stats.append(self.last_stats)
+            viewer.ready.set()
+
+    def encode(self, viewer):
+        # The latest frame for this viewer, as a delta from the last one it
+        # was sent when every cell in it was in that one too
+        state, previous = self.state, viewer.previous
+        kind = KEYFRAME
+        if previous is not None and previous.generation == state.generation and len(state.keys) <= len(previous.keys):
+            alive = np.isin(previous.keys, state.keys)
+            if np.array_equal(previous.keys[alive], state.keys):
+                dx = wrapped(state.x - previous.x[alive], self.width * POSITION_SCALE)
+                dy = wrapped(state.y - previous.y[alive], self.height * POSITION_SCALE)
+                if len(dx) == 0 or max(np.abs(dx).max(), np.abs(dy).max()) < 1 << 15:
+                    kind = DELTA
+        if kind == DELTA:
+            parts = [np.packbits(alive).tobytes(), dx.astype(np.int16).tobytes(), dy.astype(np.int16).tobytes(),
+                     (state.energy - previous.energy[alive]).tobytes(),
+                     (state.orientation - previous.orientation[alive]).tobytes()]
+        else:
+            parts = [state.x.astype(np.uint32).tobytes(), state.y.astype(np.uint32).tobytes(),
+                     state.energy.tobytes(), state.orientation.tobytes()]
+        viewer.previous = state
+
+        index = np.zeros(0, np.uint32)
+        values = np.zeros(0, bool)
+        if viewer.food_reset:
+            parts.append(np.packbits(self.grid).tobytes())
+        elif viewer.food_changes:
+            # Only the last change to each square counts
+            index = np.concatenate([c[0] for c in viewer.food_changes])[::-1]
+            values = np.concatenate([c[1] for c in viewer.food_changes])[::-1]
+            index, last = np.unique(index, return_index=True)
+            values = values[last]
+        parts += [index.tobytes(), np.packbits(values).tobytes()]
+        header = FRAME_HEADER.pack(state.generation, state.simulated_time, len(state.keys), state.food_count,
+                                   len(index), viewer.food_reset)
+        viewer.food_reset = False
+        viewer.food_changes = []
+        viewer.food_pending = 0
+        return kind, header + b"".join(parts)
+
+    async def serve(self, reader, writer):
+        viewer = None
+        try:
+            opening = await reader.readexactly(4)
+            if opening == b"GET ":
+                if not await self.accept_websocket(reader, writer):
+                    return
+            elif opening != MAGIC:
+                return
+            viewer = Viewer(writer, opening == b"GET ")
+            # drain() waits once this much is unsent, and meanwhile newer frames replace older ones
+            writer.transport.set_write_buffer_limits(high=TELEMETRY_BUFFER_BYTES)
+            self.viewers.add(viewer)
+            viewer.send(HELLO, json.dumps({"width": self.width, "height": self.height,
+                                           "position_scale": POSITION_SCALE, "energy_max": CELL_ENERGY_MAX,
+                                           "stats": self.stat_names}).encode())
+            viewer.stats.append(self.last_stats)
+            if self.state is not None:
+                viewer.published = 1
+                viewer.ready.set()
+            # Nothing the viewer sends matters except that it hung up
+            closed = asyncio.ensure_future(self.read_until_closed(reader))
+            while True:
+                ready = asyncio.ensure_future(viewer.ready.wait())
+                await asyncio.wait([ready, closed], return_when=asyncio.FIRST_COMPLETED)
+                if closed.done():
+                    ready.cancel()
+                    break
+                viewer.ready.clear()
+                while viewer.stats:
+                    generation, values = viewer.stats.popleft()
+                    viewer.send(STATS, STATS_HEADER.pack(generation) + values.tobytes())
+                if viewer.published:
+                    self.frames_sent += 1
+                    self.frames_dropped += viewer.published - 1
+                    viewer.published = 0
+                    viewer.send(*self.encode(viewer))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            self.viewers.discard(viewer)
+            writer.close()
+
+    async def read_until_closed(self, reader):
+        try:
+            while await reader.read(1 << 16):
+                pass
+        except ConnectionError:
+            pass
+
+    async def accept_websocket(self, reader, writer):
+        # The opening handshake of RFC 6455; the request line's "GET " is already read
+        request = await reader.readuntil(b"\r\n\r\n")
+        key = re.search(rb"^Sec-WebSocket-Key:\s*(\S+)", request, re.IGNORECASE | re.MULTILINE)
+        if key is None:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+            return False
+        accept = base64.b64encode(hashlib.sha1(key.group(1) + WEBSOCKET_GUID).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        return True
+
+    def close(self):
+        async def shutdown():
+            self.server.close()
+            for viewer in list(self.viewers):
+                viewer.writer.close()
+            await self.server.wait_closed()
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+class RemoteSnapshot:
+    # One received frame, with the fields of worker.Snapshot that drawing uses
+    def __init__(self, width, height, generation, simulated_time, stats, cells, food_count, food_changes, food_grid):
+        self.width = width
+        self.height = height
+        self.generation = generation
+        self.simulated_time = simulated_time
+        self.paused = False
+        self.speed = 1
+        self.turbo = False
+        self.stats = stats
+        self.readout = {}
+        self.cell_count = len(cells[0])
+        self.food_count = food_count
+        self.food_changes = food_changes
+        self.food_grid = food_grid
+        self.spatial = SpatialHash(width, height)
+        self.spatial.rebuild(cells[0], cells[1])
+        self.cells = cells
+        self.selected_cell = None
+        self.selected_position = None
+
+class TelemetryClient:
+    # Connects to a TelemetryServer and decodes its stream on a background
+    # thread into snapshots, which it serves like a SimulationWorker does
+    def __init__(self, host=TELEMETRY_HOST, port=TELEMETRY_PORT):
+        self.socket = socket.create_connection((host, port))
+        self.socket.sendall(MAGIC)
+        self.buffer = SnapshotBuffer()
+        self.stats = {}
+        self.previous = None  # Quantized x, y, energy, orientation of the last frame
+        self.frames = 0
+        self.error = None
+        kind, body = self.receive()
+        self.hello = json.loads(body)
+        self.width = self.hello["width"]
+        self.height = self.hello["height"]
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def send(self, command, *args):
+        # Viewers only watch; commands from the view are ignored
+        pass
+
+    def latest(self):
+        # None until the first frame has arrived
+        if self.error is not None:
+            raise self.error
+        return self.buffer.latest()
+
+    def close(self):
+        self.socket.close()
+
+    def read(self, n):
+        data = bytearray()
+        while len(data) < n:
+            chunk = self.socket.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("telemetry server closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def receive(self):
+        (n,) = struct.unpack("<I", self.read(4))
+        message = self.read(n)
+        return message[0], message[1:]
+
+    def run(self):
+        try:
+            while True:
+                kind, body = self.receive()
+                if kind == STATS:
+                    (generation,) = STATS_HEADER.unpack_from(body)
+                    values = np.frombuffer(body, np.float64, offset=STATS_HEADER.size)
+                    self.stats = dict(zip(self.hello["stats"], values.tolist()))
+                elif kind in (KEYFRAME, DELTA):
+                    self.buffer.publish(self.decode(kind, body))
+                    self.frames += 1
+        except OSError as error:
+            self.error = error
+
+    def decode(self, kind, body):
+        generation, simulated_time, n, food_count, changes, has_grid = FRAME_HEADER.unpack_from(body)
+        offset = FRAME_HEADER.size
+
+        def take(dtype, count):
+            nonlocal offset
+            values = np.frombuffer(body, dtype, count, offset)
+            offset += values.nbytes
+            return values
+
+        if kind == DELTA:
+            px, py, penergy, porientation = self.previous
+            alive = np.unpackbits(take(np.uint8, (len(px) + 7) // 8), count=len(px)).astype(bool)
+            x = (px[alive] + take(np.int16, n)) % (self.width * POSITION_SCALE)
+            y = (py[alive] + take(np.int16, n)) % (self.height * POSITION_SCALE)
+            energy = penergy[alive] + take(np.uint8, n)
+            orientation = porientation[alive] + take(np.uint8, n)
+        else:
+            x = take(np.uint32, n).astype(np.int64)
+            y = take(np.uint32, n).astype(np.int64)
+            energy = take(np.uint8, n)
+            orientation = take(np.uint8, n)
+        self.previous = (x, y, energy, orientation)
+
+        grid = None
+        if has_grid:
+            size = self.width * self.height
+            grid = np.unpackbits(take(np.uint8, (size + 7) // 8), count=size).astype(bool).reshape(self.width, self.height)
+        index = take(np.uint32, changes).astype(np.int64)
+        values = np.unpackbits(take(np.uint8, (changes + 7) // 8), count=changes).astype(bool)
+        food_changes = [(index // self.height, index % self.height, values)] if changes else []
+
+        cells = (x / POSITION_SCALE, y / POSITION_SCALE, energy / 255 * self.hello["energy_max"],
+                 orientation * (360 / 256), np.zeros(n, bool))
+        return RemoteSnapshot(self.width, self.height, generation, simulated_time, dict(self.stats), cells,
+                              food_count, food_changes, grid)
@@ -0,0 +1,78 @@
+import argparse
+import multiprocessing as mp
+import sys
+import numpy as np
+from config import *
+from headless import create_engine, run, tick_length
+
+# Checks how far longer ticks (engine.speed above 1) drift from plain ones.
+# A long tick senses and decides once and then sweeps the arc those outputs
+# trace, so the runs diverge as soon as one decision differs. What is
+# compared is the stats of many generations over many seeds. A difference
+# only counts when it is larger than the tolerance and also more than
+# --sigmas standard errors, where the error comes from how much the seeds
+# differ from each other.
+STAT_KEYS = ["avg_lifespan", "avg_food_eaten", "avg_distance", "remaining_food"]
+
+def run_seed(job):
+    engine_kind, seed, speed, generations = job
+    engine = create_engine(engine_kind, seed)
+    engine.speed = speed
+    rows = []
+    ticks, elapsed = run(engine, generations=generations,
+                         on_generation=lambda e, generation: rows.append([e.stats[key] for key in STAT_KEYS]))
+    engine.log_file.close()
+    return speed, rows, ticks, elapsed
+
+def compare(speed, generations, seeds, engine_kind="array", workers=None, seed=None):
+    # Per stat: mean over all generations of all seeds and the standard error
+    # of that mean over the seeds, for plain ticks and for ticks `speed` times
+    # as long, plus the ticks and seconds each took
+    run_seeds = np.random.SeedSequence(SEED if seed is None else seed).generate_state(seeds)
+    jobs = [(engine_kind, int(run_seed), run_speed, generations) for run_seed in run_seeds for run_speed in (1, speed)]
+    results = {1: ([], 0, 0), speed: ([], 0, 0)}
+    with mp.Pool(workers) as pool:
+        for run_speed, rows, ticks, elapsed in pool.imap_unordered(run_seed, jobs):
+            seed_means, all_ticks, all_elapsed = results[run_speed]
+            results[run_speed] = (seed_means + [np.mean(rows, axis=0)], all_ticks + ticks, all_elapsed + elapsed)
+    summary = {}
+    for run_speed, (seed_means, ticks, elapsed) in results.items():
+        values = np.array(seed_means, dtype=float)
+        summary[run_speed] = (values.mean(axis=0), values.std(axis=0, ddof=1) / np.sqrt(len(values)), ticks, elapsed)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare runs with plain ticks against runs with longer ones.")
+    parser.add_argument("--speed", type=tick_length, default=2, help="length of the long ticks, in plain ticks")
+    parser.add_argument("--generations", type=int, default=10)
+    parser.add_argument("--seeds", type=int, default=8, help="runs of each kind, at least 2")
+    parser.add_argument("--engine", choices=["array", "object"], default="array")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="largest accepted difference of the means, relative to the plain runs")
+    parser.add_argument("--sigmas", type=float, default=3,
+                        help="differences within this many standard errors count as noise")
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+    if args.seeds < 2:
+        parser.error("--seeds must be at least 2 to tell drift from noise")
+
+    summary = compare(args.speed, args.generations, args.seeds, args.engine, args.workers, args.seed)
+    fine_mean, fine_error, fine_ticks, fine_elapsed = summary[1]
+    coarse_mean, coarse_error, coarse_ticks, coarse_elapsed = summary[args.speed]
+    print(f"{'stat':<16}{'speed 1':>20}{f'speed {args.speed:g}':>20}{'difference':>12}{'sigmas':>8}")
+    failed = False
+    for i, key in enumerate(STAT_KEYS):
+        difference = (coarse_mean[i] - fine_mean[i]) / max(abs(fine_mean[i]), 1e-9)
+        sigmas = abs(coarse_mean[i] - fine_mean[i]) / max(np.hypot(fine_error[i], coarse_error[i]), 1e-9)
+        failed |= abs(difference) > args.tolerance and sigmas > args.sigmas
+        print(f"{key:<16}{fine_mean[i]:>12.2f} ± {fine_error[i]:<5.2f}{coarse_mean[i]:>12.2f} ± {coarse_error[i]:<5.2f}"
+              f"{difference:>+11.1%}{sigmas:>8.1f}")
+    print(f"{fine_ticks} plain ticks in {fine_elapsed:.1f}s vs {coarse_ticks} ticks of {args.speed:g} in "
+          f"{coarse_elapsed:.1f}s ({fine_elapsed / max(coarse_elapsed, 1e-9):.1f}x faster)")
+    if failed:
+        print(f"Means differ by more than {args.tolerance:.0%} and {args.sigmas:g} standard errors")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
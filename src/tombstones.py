@@ -0,0 +1,61 @@
+import numpy as np
+from cell import GENOME_LENGTH
+
+# What a dead cell leaves behind until its generation ends: enough for the
+# stats, the ranking in next_generation and checkpoints, and nothing else
+RECORD_DTYPE = np.dtype([
+    ("x", "f8"), ("y", "f8"), ("orientation", "f8"), ("energy", "f8"),
+    ("lifetime", "i8"), ("food_eaten", "i8"), ("distance_traveled", "f8"),
+    ("birth_time", "f8"), ("death_time", "f8"),
+])
+
+class Tombstones:
+    # Dead cells as fixed-size records, with their genomes as the rows of one
+    # shared buffer. Both grow by doubling and are reused by every generation.
+    def __init__(self, capacity=64):
+        self.records = np.zeros(capacity, RECORD_DTYPE)
+        self.genomes = np.zeros((capacity, GENOME_LENGTH))
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def reserve(self, n):
+        if n > len(self.records):
+            capacity = max(n, 2 * len(self.records))
+            records = np.zeros(capacity, RECORD_DTYPE)
+            genomes = np.zeros((capacity, GENOME_LENGTH))
+            records[:self.count] = self.records[:self.count]
+            genomes[:self.count] = self.genomes[:self.count]
+            self.records, self.genomes = records, genomes
+
+    def add(self, cell, death_time):
+        self.reserve(self.count + 1)
+        self.records[self.count] = (cell.x, cell.y, cell.orientation, cell.energy, cell.lifetime, cell.food_eaten,
+                                    cell.distance_traveled, cell.birth_time, death_time)
+        self.genomes[self.count] = cell.brain.weights.ravel()
+        self.count += 1
+
+    def load(self, records, genomes):
+        # records is {field: array}, e.g. from a checkpoint
+        self.count = 0
+        self.reserve(len(genomes))
+        for name in RECORD_DTYPE.names:
+            self.records[name][:len(genomes)] = records[name]
+        self.genomes[:len(genomes)] = genomes
+        self.count = len(genomes)
+
+    def clear(self):
+        self.count = 0
+
+    def field(self, name):
+        return self.records[name][:self.count]
+
+    def lifespans(self):
+        return self.field("death_time") - self.field("birth_time")
+
+    def genome_block(self):
+        return self.genomes[:self.count]
+
+    def nbytes(self):
+        return self.records.nbytes + self.genomes.nbytes
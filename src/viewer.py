@@ -0,0 +1,72 @@
+import argparse
+import time
+import pygame
+from config import *
+from telemetry import TelemetryClient
+from worker import SimulationView
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a headless run started with --serve")
+    parser.add_argument("address", nargs="?", default=f"{TELEMETRY_HOST}:{TELEMETRY_PORT}", help="HOST:PORT of the run")
+    args = parser.parse_args()
+    host, _, port = args.address.rpartition(":")
+
+    client = TelemetryClient(host or TELEMETRY_HOST, int(port))
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption(f"Evolution Simulation - {args.address}")
+    clock = pygame.time.Clock()
+
+    # The view needs a first frame to size its camera and food grid
+    while client.latest() is None:
+        pygame.event.pump()
+        time.sleep(0.01)
+    view = SimulationView(client)
+    dragging = False
+
+    running = True
+    while running:
+        frame_start = time.perf_counter()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED) and view.renderer is not None:
+                view.renderer.invalidate()
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button in (1, 2, 3):
+                dragging = True
+            if event.type == pygame.MOUSEBUTTONUP and event.button in (1, 2, 3):
+                dragging = False
+            if event.type == pygame.MOUSEMOTION and dragging:
+                view.camera.pan(-event.rel[0], -event.rel[1])
+            if event.type == pygame.MOUSEWHEEL:
+                x, y = pygame.mouse.get_pos()
+                view.camera.zoom(CAMERA_ZOOM_STEP ** event.y, x, y - LABEL_HEIGHT)
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_v:
+                    view.toggle_vision()
+                elif event.key == pygame.K_p:
+                    view.toggle_profiler()
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN):
+                    dx = (event.key == pygame.K_RIGHT) - (event.key == pygame.K_LEFT)
+                    dy = (event.key == pygame.K_DOWN) - (event.key == pygame.K_UP)
+                    view.camera.pan(dx * CAMERA_PAN_STEP * view.camera.view_width,
+                                    dy * CAMERA_PAN_STEP * view.camera.view_height)
+                elif event.key == pygame.K_HOME:
+                    view.camera.reset()
+
+        view.update()
+        dirty = view.draw(screen)
+        if dirty is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
+        view.profiler.add("frame", time.perf_counter() - frame_start)
+        view.profiler.count("frames")
+        view.tick_window()
+        clock.tick(FPS)
+
+    client.close()
+    pygame.quit()
+
+if __name__ == "__main__":
+    main()
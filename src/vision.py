@@ -0,0 +1,39 @@
+import numpy as np
+from config import *
+
+VISION_ANGLES = [-30, 0, 30]
+
+class VisionTable:
+    # Ray sample offsets for every quantized orientation, so sensing the whole
+    # population is one gather from the food grid instead of a walk per ray.
+    def __init__(self, vision_range=None, steps=None):
+        if vision_range is None:
+            vision_range = VISION_RANGE
+        if steps is None:
+            steps = VISION_ANGLE_STEPS
+        self.vision_range = vision_range
+        self.steps = steps
+        angles = np.radians(np.arange(steps)[:, None] * 360 / steps + VISION_ANGLES)  # (steps, rays)
+        distances = np.arange(1, vision_range + 1)
+        self.dx = np.cos(angles)[:, :, None] * distances  # (steps, rays, range)
+        self.dy = np.sin(angles)[:, :, None] * distances
+
+    def quantize(self, orientation):
+        return np.rint(orientation * self.steps / 360).astype(np.int64) % self.steps
+
+    def sense(self, food_grid, x, y, orientation):
+        # food_grid is a (width, height) boolean occupancy grid. Returns the 6
+        # vision inputs (distance, type) for each ray, [-1, -1] when nothing is seen.
+        width, height = food_grid.shape
+        q = self.quantize(orientation)
+        # int() in Cell.get_inputs truncates towards zero, so do the same here
+        gx = np.trunc(x[:, None, None] + self.dx[q]).astype(np.int64) % width
+        gy = np.trunc(y[:, None, None] + self.dy[q]).astype(np.int64) % height
+        hits = food_grid[gx, gy]  # (n, rays, range)
+
+        seen = hits.any(axis=2)
+        first = hits.argmax(axis=2)
+        inputs = np.empty((len(x), len(VISION_ANGLES), 2))
+        inputs[:, :, 0] = np.where(seen, (first + 1) / self.vision_range, -1)
+        inputs[:, :, 1] = np.where(seen, 1, -1)
+        return inputs.reshape(len(x), -1)
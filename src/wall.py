@@ -1,4 +1,3 @@
-import pygame
 from config import BLACK, CELL_SIZE
 
 class Wall:
@@ -7,4 +6,5 @@ class Wall:
         self.y = y
 
     def draw(self, screen):
+        import pygame
         pygame.draw.rect(screen, BLACK, (self.x * CELL_SIZE, self.y * CELL_SIZE, CELL_SIZE, CELL_SIZE))
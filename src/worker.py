@@ -0,0 +1,261 @@
+import copy
+import queue
+import threading
+import time
+import numpy as np
+from config import *
+from camera import Camera
+from profiler import Profiler, FRAME_PHASES
+from scheduler import FixedStepScheduler
+
+# Profiler readout keys that the window measures itself, the rest come from the simulation
+FRAME_KEYS = [f"{phase}_ms" for phase in FRAME_PHASES] + ["frames", "cells_drawn"]
+
+def copied(value):
+    # A copy of arrays, or lists and tuples of them, that the engine may change later
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    if isinstance(value, (list, tuple)):
+        return type(value)(copied(item) for item in value)
+    return value
+
+class CellSnapshot:
+    # The selected cell as the info panel needs it, copied out of the engine
+    def __init__(self, cell):
+        self.info = cell.get_info()
+        self.activations = {name: copied(values) for name, values in cell.get_neuron_activations().items()}
+        self.weights = copied(cell.brain.get_weights())
+        self.brain = self
+
+    def get_info(self):
+        return self.info
+
+    def get_neuron_activations(self):
+        return self.activations
+
+    def get_weights(self):
+        return self.weights
+
+def food_updates(food):
+    # Takes the food changes since the last call, as [(x, y, has_food)] with
+    # the state of each changed square now, or the whole grid after a reset
+    changes = food.changes
+    food.changes = []
+    if food.reset:
+        food.reset = False
+        return [], food.grid.copy()
+    if changes:
+        x, y = np.concatenate([c[0] for c in changes]), np.concatenate([c[1] for c in changes])
+        changes = [(x, y, food.grid[x, y])]
+    return changes, None
+
+class Snapshot:
+    # Everything the window shows of one moment of the simulation. Built on
+    # the simulation thread and never changed once published, so the window
+    # can draw from it while the simulation moves on.
+    def __init__(self, engine, scheduler, food_changes, food_grid):
+        self.width = engine.width
+        self.height = engine.height
+        self.generation = engine.generation
+        self.simulated_time = engine.simulated_time
+        self.paused = engine.paused
+        self.speed = engine.speed
+        self.turbo = scheduler.turbo
+        self.stats = dict(engine.stats)
+        self.readout = dict(engine.profiler.readout)
+        self.cell_count = engine.cell_count()
+        self.food_count = engine.food.count()
+        self.food_changes = food_changes  # [(x, y, has_food)] since the window last took a snapshot
+        self.food_grid = food_grid  # The whole grid when it was reset, else None
+        # The spatial hash is rebuilt into new arrays every tick, so a shallow
+        # copy stays as it is. Its ids become positions in the arrays below.
+        self.spatial = copy.copy(engine.spatial)
+        self.spatial.ids = np.arange(len(engine.spatial.ids))
+        self.cells = engine.drawable_arrays(engine.spatial.ids)
+        self.selected_cell = CellSnapshot(engine.selected_cell) if engine.selected_cell is not None else None
+        self.selected_position = None
+        if self.selected_cell is not None and self.cells[4].any():
+            i = np.flatnonzero(self.cells[4])[0]
+            self.selected_position = (self.cells[0][i], self.cells[1][i])
+
+class SnapshotBuffer:
+    # Double buffer between a thread that makes snapshots and the window that
+    # draws them: each new one is built in the back buffer and then swapped to
+    # the front, so the window never sees a half-built one
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.front = None
+        self.back = None
+        self.taken = False  # Whether the window has the front snapshot
+
+    def latest(self):
+        with self.lock:
+            self.taken = True
+            return self.front
+
+    def publish(self, snapshot):
+        with self.lock:
+            # Food changes the window hasn't taken yet carry over into the new snapshot
+            if self.front is not None and not self.taken and snapshot.food_grid is None:
+                snapshot.food_grid = self.front.food_grid
+                snapshot.food_changes = self.front.food_changes + snapshot.food_changes
+            self.back = snapshot
+            self.front, self.back = self.back, self.front
+            self.taken = False
+
+class SimulationWorker:
+    # Runs the engine on its own thread at the pace of the fixed-step
+    # scheduler. The window sends commands through a queue and reads the
+    # latest snapshot from a SnapshotBuffer.
+    def __init__(self, engine, checkpointer=None):
+        self.engine = engine
+        self.scheduler = FixedStepScheduler(engine)
+        self.checkpointer = checkpointer
+        self.commands = queue.Queue()
+        self.buffer = SnapshotBuffer()
+        self.error = None
+        self.running = True
+        engine.food.track_changes = True
+        engine.food.reset = True
+        self.publish()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def send(self, command, *args):
+        # command is an Engine method name, or "toggle_turbo" / "toggle_profiler"
+        self.commands.put((command, args))
+
+    def latest(self):
+        if self.error is not None:
+            raise self.error
+        return self.buffer.latest()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+    def run(self):
+        try:
+            while self.running:
+                frame_start = time.perf_counter()
+                self.handle_commands()
+                self.scheduler.run_frame()
+                if self.checkpointer is not None:
+                    self.checkpointer.on_generation(self.engine)
+                self.engine.profiler.tick_window()
+                self.publish()
+                # Turbo frames already took their time simulating
+                if not self.scheduler.turbo:
+                    time.sleep(max(0, 1 / FPS - (time.perf_counter() - frame_start)))
+        except Exception as error:
+            self.error = error
+
+    def handle_commands(self):
+        while True:
+            try:
+                command, args = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            if command == "toggle_turbo":
+                self.scheduler.toggle_turbo()
+            elif command == "toggle_profiler":
+                self.engine.profiler.toggle()
+            else:
+                getattr(self.engine, command)(*args)
+
+    def publish(self):
+        changes, grid = food_updates(self.engine.food)
+        self.buffer.publish(Snapshot(self.engine, self.scheduler, changes, grid))
+
+class FoodMirror:
+    # The window's own copy of the food grid, kept up to date from the
+    # snapshots, with the same interface the renderer uses on FoodField
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.grid = np.zeros((width, height), dtype=bool)
+        self.total = 0
+        self.track_changes = True
+        self.changes = []
+        self.reset = True
+
+    def count(self):
+        return self.total
+
+    def apply(self, snapshot):
+        if snapshot.food_grid is not None:
+            self.grid = snapshot.food_grid.copy()
+            self.changes = []
+            self.reset = True
+        for x, y, has_food in snapshot.food_changes:
+            self.grid[x, y] = has_food
+            self.changes.append((x, y))
+        self.total = snapshot.food_count
+
+class SimulationView:
+    # Stands in for the engine on the window's side: what the renderer reads
+    # comes from the latest snapshot, what the user does goes to the worker.
+    # The camera and the vision overlay only affect drawing, so they live here.
+    def __init__(self, worker):
+        self.worker = worker
+        self.snapshot = None
+        self.food = None
+        self.camera = None
+        self.show_vision = False
+        self.renderer = None
+        self.profiler = Profiler()  # Frame timings, merged with the simulation's tick timings
+        self.update()
+
+    def update(self):
+        # Takes the latest snapshot; returns whether it is a new one
+        snapshot = self.worker.latest()
+        if snapshot is self.snapshot:
+            return False
+        if self.food is None or (self.food.width, self.food.height) != (snapshot.width, snapshot.height):
+            self.food = FoodMirror(snapshot.width, snapshot.height)
+            self.camera = Camera(snapshot.width, snapshot.height,
+                                 WIDTH - INFO_PANEL_WIDTH, HEIGHT - LABEL_HEIGHT - BUTTON_AREA_HEIGHT)
+        self.food.apply(snapshot)
+        self.snapshot = snapshot
+        for name in ["width", "height", "generation", "simulated_time", "paused", "speed", "turbo",
+                     "stats", "spatial", "selected_cell"]:
+            setattr(self, name, getattr(snapshot, name))
+        return True
+
+    def tick_window(self):
+        # Called once per frame: the readout shows the simulation's latest tick
+        # timings next to the window's own frame timings
+        self.profiler.tick_window()
+        frame = {key: value for key, value in self.profiler.readout.items() if key in FRAME_KEYS}
+        self.profiler.readout = dict(self.snapshot.readout, **frame)
+
+    def draw(self, screen):
+        if self.renderer is None:
+            from renderer import Renderer
+            self.renderer = Renderer(self)
+        self.profiler.start()
+        dirty = self.renderer.draw(screen)
+        self.profiler.lap("draw")
+        return dirty
+
+    def cell_count(self):
+        return self.snapshot.cell_count
+
+    def drawable_arrays(self, ids):
+        return tuple(column[ids] for column in self.snapshot.cells)
+
+    def select_cell(self, mouse_pos):
+        position = self.camera.click_position(mouse_pos)
+        if position is not None:
+            self.worker.send("select_at", *position)
+
+    def center_on_selected(self):
+        if self.snapshot.selected_position is not None:
+            self.camera.center_on(*self.snapshot.selected_position)
+
+    def toggle_vision(self):
+        self.show_vision = not self.show_vision
+
+    def toggle_profiler(self):
+        self.worker.send("toggle_profiler")
+        self.profiler.toggle()